@@ -11,16 +11,39 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import csv
+import functools
+import json
 import logging
-from argparse import ArgumentTypeError
+import os
+from argparse import ArgumentTypeError, FileType
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
-from dateutil import parser, tz
 from keystoneauth1.exceptions import HttpError
-from osc_lib import utils
+from osc_lib import exceptions, utils
 from osc_lib.command import command
 
-from doniclient.osc.common import HardwarePatchCommand
+from doniclient.osc.cli import HardwareSelectionMixin
+from doniclient.osc.common import (
+    BaseParser,
+    CacheOptionsMixin,
+    CheckResultsMixin,
+    HardwarePatchCommand,
+    error_text,
+)
+from doniclient.v1.availability import (
+    STATUSES,
+    AvailabilityIndex,
+    Window,
+    WindowList,
+    expand_rrule,
+    missing_windows,
+    validate_window,
+)
+from doniclient.v1.jsonstream import iter_file_chunks, iter_json_items
+from doniclient.v1.utils import bounded_map, is_uuid_like
 
 if TYPE_CHECKING:
     from doniclient.v1.client import Client as DoniClient
@@ -28,14 +51,42 @@ if TYPE_CHECKING:
 LOG = logging.getLogger(__name__)
 COLUMNS = ("uuid", "start", "end")
 
+WINDOW_OPS = ("add", "set", "remove")
+
+# Days from the first occurrence over which recurring windows are expanded.
+DEFAULT_RRULE_HORIZON = 90
+
+# One line of an availability file. ``window`` is the UUID of the window to
+# change, for the "set" and "remove" operations.
+WindowChange = namedtuple(
+    "WindowChange", ["line", "hardware", "op", "window", "start", "end"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _local_timezone():
+    from dateutil import tz
+
+    return tz.gettz()
+
 
 def flexible_datetime(date_str):
+    # Strict ISO 8601 is by far the most common input and much cheaper to
+    # parse; dateutil handles everything else.
+    iso_str = date_str
+    if iso_str.endswith(("Z", "z")):
+        # Only accepted by fromisoformat from Python 3.11.
+        iso_str = iso_str[:-1] + "+00:00"
     try:
-        parsed_dt = parser.parse(date_str)
-        dt_with_tz = parsed_dt.replace(tzinfo=parsed_dt.tzinfo or tz.gettz())
-        return dt_with_tz
+        parsed_dt = datetime.fromisoformat(iso_str)
     except ValueError:
-        raise ArgumentTypeError(f"Not a valid date: '{date_str}'.")
+        from dateutil import parser
+
+        try:
+            parsed_dt = parser.parse(date_str)
+        except (ValueError, OverflowError):
+            raise ArgumentTypeError(f"Not a valid date: '{date_str}'.")
+    return parsed_dt.replace(tzinfo=parsed_dt.tzinfo or _local_timezone())
 
 
 def _add_date_args(parser, required=True):
@@ -53,55 +104,190 @@ def _add_date_args(parser, required=True):
     )
 
 
-class ListHardwareAvailability(command.Lister):
-    """List all availability windows for a given hardware item."""
+class ListHardwareAvailability(
+    CheckResultsMixin, HardwareSelectionMixin, CacheOptionsMixin, command.Lister
+):
+    """List availability windows of one or more hardware items.
+
+    With --start and --end, report instead whether each hardware item is
+    available for that whole period, only part of it, or not at all. The
+    command fails after printing the results if any hardware item could not
+    be found or its availability could not be fetched.
+    """
 
     columns = COLUMNS
+    hardware_columns = ("hardware_uuid", "hardware_name")
+    status_columns = ("uuid", "name", "status")
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
+        _add_date_args(parser, required=False)
         parser.add_argument(
-            dest="hardware_uuid",
-            metavar="<hardware_uuid>",
-            help=("unique ID of hardware item"),
+            "--status",
+            choices=STATUSES,
+            help="With --start and --end, only show hardware with this status.",
         )
         return parser
 
     def take_action(self, parsed_args):
-        """List all hw items in Doni."""
+        """List availability windows of hw items in Doni."""
         hw_client: "DoniClient" = self.app.client_manager.inventory
+        if bool(parsed_args.start) != bool(parsed_args.end):
+            raise exceptions.CommandError("--start and --end must be used together.")
+        targets = self.get_targets(hw_client, parsed_args)
+        if len(targets) == 1 and targets[0][2]:
+            raise exceptions.CommandError(targets[0][2])
+        names = {uuid: name for uuid, name, _ in targets if uuid}
+
+        availability, errors = hw_client.get_availability_many(
+            list(names), concurrency=parsed_args.concurrency
+        )
+        self.failed, self.total = 0, len(targets)
+        for uuid, _, error in targets:
+            if error:
+                LOG.error(error)
+                self.failed += 1
+            elif uuid in errors:
+                LOG.error(f"{names[uuid] or uuid}: {error_text(errors[uuid])}")
+                self.failed += 1
+        if len(targets) == 1 and errors:
+            raise next(iter(errors.values()))
+
+        if parsed_args.start:
+            return self.query(parsed_args, targets, availability, errors)
+
+        if len(targets) == 1:
+            items = next(iter(availability.values()), [])
+            items_iterator = (
+                utils.get_dict_properties(s, self.columns, formatters={}) for s in items
+            )
+            return (self.columns, items_iterator)
+
+        columns = self.hardware_columns + self.columns
+        rows = [
+            (uuid, names[uuid]) + utils.get_dict_properties(window, self.columns)
+            for uuid, windows in availability.items()
+            for window in windows
+        ]
+        return (columns, rows)
+
+    def query(self, parsed_args, targets, availability, errors):
+        index = AvailabilityIndex(availability)
+        rows = []
+        for uuid, name, error in targets:
+            if error or uuid in errors:
+                status = error or error_text(errors[uuid])
+            else:
+                status = index.status(uuid, parsed_args.start, parsed_args.end)
+            if parsed_args.status and status != parsed_args.status:
+                continue
+            rows.append((uuid, name, status))
+        return (self.status_columns, rows)
+
+
+class AvailabilityPatchCommand(HardwarePatchCommand):
+    """Base for commands that change the availability windows of hardware."""
+
+    needs_uuid = True
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--skip-validation",
+            action="store_true",
+            help=(
+                "Do not check the window against existing windows before "
+                "sending the change."
+            ),
+        )
+        return parser
+
+    def get_windows(self, hw_client, parsed_args):
         try:
-            items = hw_client.get_availability(parsed_args.hardware_uuid)
+            return WindowList(hw_client.get_availability(parsed_args.uuid))
         except HttpError as ex:
             LOG.error(ex.response.text)
             raise ex
 
-        items_iterator = (
-            utils.get_dict_properties(s, self.columns, formatters={}) for s in items
-        )
-        return (self.columns, items_iterator)
+    def check_window(self, windows, start, end, window_uuid=None):
+        try:
+            validate_window(windows, start, end, window_uuid=window_uuid)
+        except ValueError as ex:
+            raise exceptions.CommandError(str(ex))
 
 
-class AddHardwareAvailability(HardwarePatchCommand):
+class AddHardwareAvailability(AvailabilityPatchCommand):
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
         _add_date_args(parser)
+        parser.add_argument(
+            "--rrule",
+            metavar="<rule>",
+            help=(
+                "Add a window for each occurrence of this RFC 5545 recurrence "
+                "rule, e.g. 'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU'. --start and --end "
+                "give the first occurrence. Occurrences already covered by "
+                "existing windows are skipped."
+            ),
+        )
+        parser.add_argument(
+            "--horizon",
+            metavar="<days>",
+            type=float,
+            default=DEFAULT_RRULE_HORIZON,
+            help=(
+                "With --rrule, only add occurrences starting within this many "
+                f"days of --start (default: {DEFAULT_RRULE_HORIZON})."
+            ),
+        )
         return parser
 
+    def get_new_windows(self, parsed_args):
+        if not parsed_args.rrule:
+            return [Window(parsed_args.start, parsed_args.end, None)]
+        hw_client = self.app.client_manager.inventory
+        self.existing = self.get_windows(hw_client, parsed_args)
+        horizon = parsed_args.start + timedelta(days=parsed_args.horizon)
+        try:
+            occurrences = expand_rrule(
+                parsed_args.rrule, parsed_args.start, parsed_args.end, horizon
+            )
+            return list(missing_windows(self.existing, occurrences))
+        except ValueError as ex:
+            raise exceptions.CommandError(f"Invalid recurrence rule: {ex}")
+
     def get_patch(self, parsed_args):
+        self.existing = None
         return [
             {
                 "op": "add",
                 "path": "/availability/-",
                 "value": {
-                    "start": parsed_args.start,
-                    "end": parsed_args.end,
+                    "start": window.start,
+                    "end": window.end,
                 },
             }
+            for window in self.get_new_windows(parsed_args)
         ]
 
+    def validate(self, hw_client, parsed_args, patch):
+        if parsed_args.skip_validation:
+            return
+        windows = getattr(self, "existing", None)
+        if windows is None:
+            windows = self.get_windows(hw_client, parsed_args)
+        values = [op["value"] for op in patch]
+        changes = [
+            WindowChange(n, parsed_args.uuid, "add", None, v["start"], v["end"])
+            for n, v in enumerate(values, start=1)
+        ]
+        try:
+            check_changes(windows, changes)
+        except ValueError as ex:
+            raise exceptions.CommandError(str(ex))
+
 
-class UpdateHardwareAvailability(HardwarePatchCommand):
+class UpdateHardwareAvailability(AvailabilityPatchCommand):
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
         parser.add_argument(
@@ -128,8 +314,27 @@ class UpdateHardwareAvailability(HardwarePatchCommand):
 
         return patch
 
+    def validate(self, hw_client, parsed_args, patch):
+        if parsed_args.skip_validation:
+            return
+        windows = self.get_windows(hw_client, parsed_args)
+        current = windows.get(parsed_args.window_uuid)
+        if current is None:
+            raise exceptions.CommandError(
+                f"Hardware {parsed_args.uuid} has no availability window "
+                f"{parsed_args.window_uuid}."
+            )
+        self.check_window(
+            windows,
+            parsed_args.start or current.start,
+            parsed_args.end or current.end,
+            window_uuid=parsed_args.window_uuid,
+        )
+
 
 class RemoveHardwareAvailability(HardwarePatchCommand):
+    needs_uuid = True
+
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
         parser.add_argument(
@@ -146,3 +351,200 @@ class RemoveHardwareAvailability(HardwarePatchCommand):
                 "path": f"/availability/{parsed_args.window_uuid}",
             },
         ]
+
+
+def window_patch(change):
+    """Return the JSON-Patch operations for a WindowChange."""
+    if change.op == "remove":
+        return [{"op": "remove", "path": f"/availability/{change.window}"}]
+    if change.op == "set":
+        return [
+            {
+                "op": "replace",
+                "path": f"/availability/{change.window}/{field}",
+                "value": value.isoformat(),
+            }
+            for field, value in (("start", change.start), ("end", change.end))
+            if value
+        ]
+    return [
+        {
+            "op": "add",
+            "path": "/availability/-",
+            "value": {"start": change.start.isoformat(), "end": change.end.isoformat()},
+        }
+    ]
+
+
+def check_changes(windows, changes):
+    """Check a sequence of WindowChanges against the existing ``windows``.
+
+    Changes are applied in order to a copy of the windows, so that windows
+    added earlier in the sequence are taken into account. The copy is indexed
+    once and updated as each change is applied.
+
+    Raises:
+        ValueError: if a change refers to an unknown window, or would leave
+            an empty or overlapping window.
+    """
+    current = WindowList(windows)
+    for change in changes:
+        if change.op == "add":
+            validate_window(current, change.start, change.end)
+            current.add(Window(change.start, change.end, f"change {change.line}"))
+            continue
+        existing = current.get(change.window)
+        if existing is None:
+            raise ValueError(f"No availability window {change.window}.")
+        if change.op == "remove":
+            current.remove(change.window)
+            continue
+        start = change.start or existing.start
+        end = change.end or existing.end
+        validate_window(current, start, end, window_uuid=change.window)
+        current.remove(change.window)
+        current.add(Window(start, end, change.window))
+
+
+class ApplyHardwareAvailability(CheckResultsMixin, BaseParser, command.Lister):
+    """Apply availability window changes to many hardware items from a file.
+
+    The file is a JSON array, NDJSON, or CSV with a header row, with one
+    change per record and the fields ``hardware`` (name or UUID), ``op``
+    (add, set or remove; default add), ``window`` (the window UUID, for set
+    and remove), ``start`` and ``end``. The changes of each hardware item are
+    combined into a single PATCH request, and requests for different items
+    are sent in parallel. The command fails after printing the results if
+    the changes of any hardware item could not be applied.
+    """
+
+    columns = ("uuid", "name", "operations", "result")
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--file",
+            metavar="<file>",
+            type=FileType("r"),
+            required=True,
+            help="JSON, NDJSON or CSV file of window changes, or - for stdin.",
+        )
+        parser.add_argument(
+            "--file-format",
+            choices=("json", "csv"),
+            help="Format of the file. Defaults to csv for .csv files, else json.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            metavar="<N>",
+            type=int,
+            default=8,
+            help="Number of requests to send in parallel (default: 8).",
+        )
+        parser.add_argument(
+            "--skip-validation",
+            action="store_true",
+            help=(
+                "Do not check the changes against existing windows before "
+                "sending them."
+            ),
+        )
+        return parser
+
+    def read_records(self, f, file_format):
+        if file_format is None:
+            _, ext = os.path.splitext(f.name)
+            file_format = "csv" if ext.lower() == ".csv" else "json"
+        if file_format == "csv":
+            return csv.DictReader(f)
+        return iter_json_items(iter_file_chunks(f))
+
+    def parse_change(self, line, record):
+        def date(field):
+            value = record.get(field)
+            return flexible_datetime(value) if value else None
+
+        op = record.get("op") or "add"
+        if op not in WINDOW_OPS:
+            raise ValueError(f"unknown operation '{op}'")
+        change = WindowChange(
+            line,
+            record.get("hardware") or record.get("hardware_uuid"),
+            op,
+            record.get("window") or record.get("window_uuid"),
+            date("start"),
+            date("end"),
+        )
+        if not change.hardware:
+            raise ValueError("missing hardware")
+        if op in ("set", "remove") and not change.window:
+            raise ValueError(f"'{op}' requires a window")
+        if op == "add" and not (change.start and change.end):
+            raise ValueError("'add' requires a start and an end")
+        if op == "set" and not (change.start or change.end):
+            raise ValueError("'set' requires a start or an end")
+        return change
+
+    def read_changes(self, parsed_args):
+        """Return the changes of the file grouped by hardware name or UUID."""
+        changes = OrderedDict()
+        with parsed_args.file as f:
+            records = self.read_records(f, parsed_args.file_format)
+            for line, record in enumerate(records, start=1):
+                try:
+                    change = self.parse_change(line, record)
+                except (ArgumentTypeError, ValueError) as ex:
+                    raise exceptions.CommandError(f"Invalid change {line}: {ex}")
+                changes.setdefault(change.hardware, []).append(change)
+        return changes
+
+    def take_action(self, parsed_args):
+        hw_client: "DoniClient" = self.app.client_manager.inventory
+        changes = self.read_changes(parsed_args)
+
+        targets = []
+        for hardware, hw_changes in changes.items():
+            if is_uuid_like(hardware):
+                targets.append((hardware, None, hw_changes, None))
+                continue
+            try:
+                uuid = hw_client.find_uuid(hardware)
+                targets.append((uuid, hardware, hw_changes, None))
+            except LookupError as ex:
+                targets.append((None, hardware, hw_changes, ex))
+
+        windows, errors = {}, {}
+        if not parsed_args.skip_validation:
+            windows, errors = hw_client.get_availability_many(
+                [uuid for uuid, _, _, error in targets if not error],
+                concurrency=parsed_args.concurrency,
+            )
+
+        def apply(target):
+            uuid, _, hw_changes, error = target
+            if error:
+                raise error
+            if uuid in errors:
+                raise errors[uuid]
+            if not parsed_args.skip_validation:
+                check_changes(WindowList(windows[uuid]), hw_changes)
+            patch = [op for change in hw_changes for op in window_patch(change)]
+            if parsed_args.dry_run:
+                return json.dumps(patch)
+            hw_client.update(uuid, patch)
+            return "applied"
+
+        hw_client.reserve_connections(parsed_args.concurrency)
+        rows = []
+        self.failed, self.total = 0, len(targets)
+        for target, result, error in bounded_map(
+            apply, targets, parsed_args.concurrency
+        ):
+            if error is not None:
+                if isinstance(error, HttpError):
+                    LOG.error(error_text(error))
+                result = error_text(error)
+                self.failed += 1
+            uuid, name, hw_changes, _ = target
+            rows.append((uuid, name, len(hw_changes), result))
+        return self.columns, rows
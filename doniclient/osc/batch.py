@@ -0,0 +1,190 @@
+"""Runs many hardware commands in a single invocation."""
+import json
+import logging
+import shlex
+import threading
+from argparse import FileType
+from collections import namedtuple
+
+from osc_lib import exceptions
+
+from doniclient.osc.availability import (
+    AddHardwareAvailability,
+    RemoveHardwareAvailability,
+    UpdateHardwareAvailability,
+)
+from doniclient.osc.cli import SyncHardware, UnsetHardware, UpdateHardware
+from doniclient.osc.common import BaseParser, error_text
+from doniclient.v1.utils import bounded_map
+
+LOG = logging.getLogger(__name__)  # Get the logger of this module
+
+# Commands that can be used in a batch, by their name after "hardware".
+BATCH_COMMANDS = {
+    "set": UpdateHardware,
+    "unset": UnsetHardware,
+    "sync": SyncHardware,
+    "availability add": AddHardwareAvailability,
+    "availability set": UpdateHardwareAvailability,
+    "availability remove": RemoveHardwareAvailability,
+}
+
+# ``after`` holds the events of the earlier lines this line must wait for, and
+# ``done`` is set once this line has run.
+BatchLine = namedtuple(
+    "BatchLine", ["number", "name", "command", "parsed_args", "error", "after", "done"]
+)
+
+
+class BatchHardware(BaseParser):
+    """Run many hardware commands with a single client and session.
+
+    Each line of the input is one command, written as it would be after
+    ``openstack hardware`` (e.g. ``set node-1 --name node-01``), or as a JSON
+    array of the same words. Empty lines and lines starting with ``#`` are
+    ignored. All commands share one authenticated client and connection pool.
+
+    Hardware names are resolved to UUIDs as the input is read, so they refer
+    to the hardware as it was before the batch, even if an earlier line
+    renames it. With --concurrency, lines run in parallel, except that lines
+    for the same hardware item run in input order; lines that select hardware
+    with --all or filters run after every earlier line, and before every later
+    one. One line is written per command with its line number, outcome and
+    name, followed by the error if it failed.
+    """
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "-f",
+            "--file",
+            help="File of commands, one per line, '-' for stdin (default)",
+            type=FileType("r"),
+            default="-",
+        )
+        parser.add_argument(
+            "--concurrency",
+            metavar="<N>",
+            type=int,
+            default=1,
+            help="Number of commands to run in parallel (default: 1).",
+        )
+        return parser
+
+    def report(self, number, status, name, detail=None):
+        self.app.stdout.write(f"{number}\t{status}\t{name}\t{detail or ''}\n")
+
+    def split_line(self, text):
+        if text.startswith("["):
+            words = json.loads(text)
+            if not all(isinstance(word, str) for word in words):
+                raise ValueError("JSON commands must be arrays of strings")
+        else:
+            words = shlex.split(text)
+        # Accept lines copied from a shell script as well.
+        if words[:1] == ["openstack"]:
+            words = words[1:]
+        if words[:1] == ["hardware"]:
+            words = words[1:]
+        for length in (2, 1):
+            name = " ".join(words[:length])
+            if name in BATCH_COMMANDS:
+                return name, words[length:]
+        raise ValueError(f"unsupported command '{' '.join(words[:2])}'")
+
+    def parse_args(self, name, argv, dry_run=False):
+        """Return the command and its parsed arguments."""
+        command_class = BATCH_COMMANDS[name]
+        cmd = command_class(self.app, self.app_args)
+        parser = cmd.get_parser(f"openstack hardware {name}")
+        if dry_run:
+            argv.append("--dry-run")
+        try:
+            parsed_args = parser.parse_args(argv)
+        except SystemExit:
+            # argparse has already printed the reason to stderr.
+            raise ValueError("invalid arguments")
+        return cmd, parsed_args
+
+    def resolve_targets(self, hw_client, parsed_args):
+        """Replace the hardware names of a command by UUIDs, and return them.
+
+        Returns None if the command selects hardware with --all or filters
+        rather than by name.
+
+        Raises:
+            LookupError: if a name does not match exactly one hardware item.
+        """
+        if hasattr(parsed_args, "uuid"):
+            parsed_args.uuid = hw_client.find_uuid(parsed_args.uuid)
+            return [parsed_args.uuid]
+        if not parsed_args.uuids:
+            return None
+        parsed_args.uuids = [hw_client.find_uuid(arg) for arg in parsed_args.uuids]
+        return parsed_args.uuids
+
+    def read_lines(self, hw_client, f, dry_run=False):
+        """Parse the input lazily, chaining lines that target the same item."""
+        last_done = {}
+        # The last line that selected hardware with --all or filters.
+        barrier = None
+        for number, text in enumerate(f, start=1):
+            text = text.strip()
+            if not text or text.startswith("#"):
+                continue
+            name, cmd, parsed_args, error = text, None, None, None
+            targets = []
+            try:
+                name, argv = self.split_line(text)
+                cmd, parsed_args = self.parse_args(name, argv, dry_run=dry_run)
+                targets = self.resolve_targets(hw_client, parsed_args)
+            except (ValueError, LookupError) as ex:
+                error = ex
+            done = threading.Event()
+            if targets is None:
+                after = list(last_done.values())
+                if barrier:
+                    after.append(barrier)
+                last_done, barrier = {}, done
+            else:
+                after = [last_done[t] for t in targets if t in last_done]
+                if barrier and not after:
+                    after.append(barrier)
+                last_done.update(dict.fromkeys(targets, done))
+            yield BatchLine(number, name, cmd, parsed_args, error, after, done)
+
+    def run_line(self, line):
+        for event in line.after:
+            event.wait()
+        try:
+            if line.error:
+                raise line.error
+            line.command.apply_cache_options(line.parsed_args)
+            line.command.take_action(line.parsed_args)
+            # Bulk commands report failed items in their rows.
+            check_results = getattr(line.command, "check_results", None)
+            if check_results:
+                check_results()
+        finally:
+            line.done.set()
+
+    def take_action(self, parsed_args):
+        hw_client = self.app.client_manager.inventory
+        failed = 0
+        total = 0
+        with parsed_args.file as f:
+            lines = self.read_lines(hw_client, f, dry_run=parsed_args.dry_run)
+            hw_client.reserve_connections(parsed_args.concurrency)
+            for line, _, error in bounded_map(
+                self.run_line, lines, parsed_args.concurrency
+            ):
+                total += 1
+                if error is None:
+                    self.report(line.number, "ok", line.name)
+                    continue
+                failed += 1
+                self.report(line.number, "failed", line.name, error_text(error))
+        hw_client.save_name_index()
+
+        if failed:
+            raise exceptions.CommandError(f"{failed} of {total} commands failed.")
@@ -1,29 +1,171 @@
 """Implements Doni command line interface."""
 
+import abc
 import argparse
+import fnmatch
+import itertools
 import json
 import logging
+import os
+import threading
 from argparse import FileType, Namespace
 from collections import namedtuple
 
-from keystoneauth1.exceptions import Conflict, HttpError
+from keystoneauth1.exceptions import Conflict, Forbidden, HttpError, NotFound
+from osc_lib import exceptions
 from osc_lib import utils as oscutils
 from osc_lib.command import command
 
 from doniclient.osc.common import (
     BaseParser,
+    CheckResultsMixin,
     ExpandDotNotation,
     ExpandDotNotationAndStoreTrue,
     HardwarePatchCommand,
+    add_nested_format_arg,
     conditional_action,
+    error_text,
+    hardware_formatters,
 )
 from doniclient.v1 import resource_fields as res_fields
+from doniclient.v1.compression import (
+    COMPRESSIONS,
+    compression_for_path,
+    open_reader,
+    open_writer,
+)
+from doniclient.v1.jsonstream import iter_binary_file_chunks, iter_json_items
+from doniclient.v1.utils import bounded_map, is_uuid_like
 
 LOG = logging.getLogger(__name__)  # Get the logger of this module
 
 PropertyFlag = namedtuple("PropertyFlag", ["flag", "type", "default"])
 
 
+WORKER_STATES = ["PENDING", "IN_PROGRESS", "ERROR", "STEADY"]
+
+
+def extract_workers_state(workers):
+    # Extract worker types and their corresponding states and last errors
+    # from workers list
+    worker_details = {}
+    for worker in workers:
+        worker_type = worker.get("worker_type")
+        state = worker.get("state")
+        last_error = worker.get("state_details", {}).get("last_error")
+        if worker_type and (state or last_error):
+            if worker_type not in worker_details:
+                worker_details[worker_type] = {}
+            if state:
+                worker_details[worker_type]["state"] = state
+            if last_error:
+                worker_details[worker_type]["last_error"] = last_error
+    return worker_details
+
+
+def matches_worker_filters(worker_details, worker_type=None, worker_state=None):
+    """Check the output of extract_workers_state against worker filters.
+
+    With only ``worker_state``, any worker in that state matches. With both,
+    the worker of type ``worker_type`` must be in ``worker_state``.
+    """
+    if worker_type and worker_type not in worker_details:
+        return False
+    if worker_state:
+        if worker_type:
+            return worker_details[worker_type].get("state") == worker_state
+        return any(
+            details.get("state") == worker_state for details in worker_details.values()
+        )
+    return True
+
+
+def _add_worker_filter_args(parser):
+    parser.add_argument(
+        "--worker-type",
+        metavar="<worker_type>",
+        help="Filter by worker type",
+        required=False,
+        default="",
+    )
+    parser.add_argument(
+        "--worker-state",
+        help="Filter by worker state",
+        choices=WORKER_STATES,
+        required=False,
+        default="",
+    )
+
+
+class WorkerIndex(object):
+    """Index of hardware items by worker type and state.
+
+    The index is built in a single pass over the hardware, after which the
+    worker filters are answered with dict lookups. Hardware is referred to by
+    its position in the input, and every list of positions is sorted.
+
+    Attributes:
+        hardware (list): ``(hardware, worker_details)`` tuples, in input order,
+            where ``worker_details`` is the output of extract_workers_state.
+        by_type (dict): maps worker types to a dict of worker states to the
+            positions of hardware whose worker of that type is in that state.
+        by_state (dict): maps worker states to the positions of hardware with
+            any worker in that state.
+    """
+
+    def __init__(self, hardware=()):
+        self.hardware = []
+        self.by_type = {}
+        self.by_state = {}
+        self._with_type = {}
+        for item in hardware:
+            self.add(item)
+
+    def add(self, hardware):
+        position = len(self.hardware)
+        worker_details = extract_workers_state(hardware.get("workers", []))
+        self.hardware.append((hardware, worker_details))
+        for worker_type, details in worker_details.items():
+            state = details.get("state")
+            self._with_type.setdefault(worker_type, []).append(position)
+            self.by_type.setdefault(worker_type, {}).setdefault(state, []).append(
+                position
+            )
+            if state:
+                positions = self.by_state.setdefault(state, [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+
+    def select(self, worker_type=None, worker_state=None):
+        """Return the positions of hardware matching the worker filters.
+
+        The filters have the same meaning as in matches_worker_filters.
+        """
+        if worker_type and worker_state:
+            return self.by_type.get(worker_type, {}).get(worker_state, [])
+        if worker_type:
+            return self._with_type.get(worker_type, [])
+        if worker_state:
+            return self.by_state.get(worker_state, [])
+        return range(len(self.hardware))
+
+    def worker_types(self, positions):
+        """Return the worker types of the given hardware, in order of appearance."""
+        types = {}
+        for position in positions:
+            types.update(dict.fromkeys(self.hardware[position][1]))
+        return list(types)
+
+    def summary(self, positions):
+        """Yield ``(worker_type, state, count)`` for the given hardware."""
+        selected = set(positions)
+        for worker_type, states in self.by_type.items():
+            for state, members in states.items():
+                count = sum(1 for position in members if position in selected)
+                if count:
+                    yield worker_type, state or "-", count
+
+
 class ListHardware(BaseParser, command.Lister):
     """List all hardware in the Doni database."""
 
@@ -41,37 +183,54 @@ class ListHardware(BaseParser, command.Lister):
             help="Include all columns.",
             action="store_true",
         )
+        _add_worker_filter_args(parser)
         parser.add_argument(
-            "--worker-type",
-            metavar="<worker_type>",
-            help="Filter by worker type",
-            required=False,
-            default="",
+            "--hardware-type",
+            metavar="<hardware_type>",
+            help="Filter by hardware type",
         )
         parser.add_argument(
-            "--worker-state",
-            help="Filter by worker state",
-            choices=["PENDING", "IN_PROGRESS", "ERROR", "STEADY"],
-            required=False,
-            default="",
+            "--name-prefix",
+            metavar="<prefix>",
+            help="Filter by the start of the hardware name",
         )
+        parser.add_argument(
+            "--project-id",
+            metavar="<project_id>",
+            help="Filter by owning project",
+        )
+        parser.add_argument(
+            "--page-size",
+            metavar="<N>",
+            type=int,
+            help=(
+                "Fetch hardware from the server N items at a time. "
+                "By default everything is fetched in one request."
+            ),
+        )
+        parser.add_argument(
+            "--group-by",
+            choices=["worker-state"],
+            help=(
+                "Instead of listing hardware, count the hardware items in each "
+                "state of each worker type."
+            ),
+        )
+        parser.add_argument(
+            "--worker-columns",
+            metavar="<worker_types>",
+            type=lambda value: [t for t in value.split(",") if t],
+            help=(
+                "Comma-separated worker types to show columns for, e.g. "
+                "'baremetal,blazar.physical_host'. Rows are then written as they "
+                "are received instead of after the whole inventory is loaded."
+            ),
+        )
+        add_nested_format_arg(parser)
         return parser
 
     def extract_workers_state(self, workers):
-        # Extract worker types and their corresponding states and last errors from workers list
-        worker_details = {}
-        for worker in workers:
-            worker_type = worker.get("worker_type")
-            state = worker.get("state")
-            last_error = worker.get("state_details", {}).get("last_error")
-            if worker_type and (state or last_error):
-                if worker_type not in worker_details:
-                    worker_details[worker_type] = {}
-                if state:
-                    worker_details[worker_type]["state"] = state
-                if last_error:
-                    worker_details[worker_type]["last_error"] = last_error
-        return worker_details
+        return extract_workers_state(workers)
 
     def take_action(self, parsed_args):
         """List all hardware items in Doni."""
@@ -85,54 +244,81 @@ class ListHardware(BaseParser, command.Lister):
             labels = list(
                 res_fields.HARDWARE_DETAILED_RESOURCE.labels
             )  # Convert tuple to list
+        formatters = hardware_formatters(parsed_args.nested_format)
+
+        # Filters are sent to the server, which may ignore them; the worker
+        # index below applies the worker filters again.
+        filters = {
+            field: getattr(parsed_args, field)
+            for field in (
+                "worker_type",
+                "worker_state",
+                "hardware_type",
+                "name_prefix",
+                "project_id",
+            )
+            if getattr(parsed_args, field)
+        }
 
-        # Fetch hardware data based on --all option
+        # Fetch hardware data based on --all option. Items are read page by
+        # page; they are only streamed to the output with --worker-columns,
+        # as otherwise the whole inventory is needed to know which worker
+        # columns to show.
         if parsed_args.all:
-            data = hw_client.export()
+            data = hw_client.iter_export(page_size=parsed_args.page_size, **filters)
         else:
-            data = hw_client.list()
-
-        worker_types = []
-        output_data = []
-
-        # Extract filter values for better readability
-        worker_type_filter = parsed_args.worker_type
-        worker_state_filter = parsed_args.worker_state
+            data = hw_client.iter_list(page_size=parsed_args.page_size, **filters)
+
+        if parsed_args.worker_columns is not None and not parsed_args.group_by:
+            worker_types = parsed_args.worker_columns
+            for worker_type in worker_types:
+                labels += [worker_type, worker_type + " last error"]
+            return labels, self.stream_rows(
+                data, columns, formatters, worker_types, parsed_args
+            )
+
+        index = WorkerIndex(data)
+        selected = index.select(parsed_args.worker_type, parsed_args.worker_state)
+
+        if parsed_args.group_by == "worker-state":
+            return ("worker_type", "state", "count"), list(index.summary(selected))
+
+        worker_types = index.worker_types(selected)
+        output_data = [
+            self.make_row(*index.hardware[position], columns, formatters, worker_types)
+            for position in selected
+        ]
+
+        for worker_type in worker_types:
+            labels += [worker_type, worker_type + " last error"]
+        return labels, output_data
 
+    def make_row(self, hardware, worker_details, columns, formatters, worker_types):
+        output_item = oscutils.get_dict_properties(
+            hardware, columns, formatters=formatters
+        )
+        for worker_type in worker_types:
+            details = worker_details.get(worker_type, {})
+            output_item += (
+                details.get("state", "-"),
+                details.get("last_error", "-"),
+            )
+        return output_item
+
+    def stream_rows(self, data, columns, formatters, worker_types, parsed_args):
+        """Lazily yield a row for each hardware item matching the worker filters.
+
+        The worker columns are known up front, so rows can be formatted as the
+        hardware is received.
+        """
         for hardware in data:
-            workers = hardware.get("workers", [])
-            worker_details = self.extract_workers_state(workers)
-
-            # Apply worker type and state filters
-            if (worker_type_filter and worker_type_filter not in worker_details) or (
-                worker_state_filter
-                and all(worker_state_filter != details["state"] for details in worker_details.values())
+            worker_details = extract_workers_state(hardware.get("workers", []))
+            if matches_worker_filters(
+                worker_details, parsed_args.worker_type, parsed_args.worker_state
             ):
-                continue
-
-            output_item = oscutils.get_dict_properties(hardware, columns)
-
-            # Apply combined worker type and state filter
-            if worker_type_filter and worker_state_filter:
-                details = worker_details.get(worker_type_filter, {})
-                if worker_state_filter not in details["state"]:
-                    continue
-
-            for worker_type, details in worker_details.items():
-                worker_state = details.get("state", "-")
-                worker_error = details.get("last_error", "-")
-                output_item = output_item + (worker_state,)
-                output_item = output_item + (worker_error,)
-
-                if worker_type not in worker_types:
-                    worker_types.append(worker_type)
-                    worker_types.append(worker_type + " last error")
-
-            output_data.append(output_item)
-
-        labels += worker_types  # Add worker types to labels list
-        return labels, output_data
-
+                yield self.make_row(
+                    hardware, worker_details, columns, formatters, worker_types
+                )
 
 
 class GetHardware(BaseParser, command.ShowOne):
@@ -140,6 +326,11 @@ class GetHardware(BaseParser, command.ShowOne):
 
     needs_uuid = True
 
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        add_nested_format_arg(parser)
+        return parser
+
     def take_action(self, parsed_args):
         """List all hw items in Doni."""
         hw_client = self.app.client_manager.inventory
@@ -149,47 +340,204 @@ class GetHardware(BaseParser, command.ShowOne):
             LOG.error(ex.response.text)
             raise ex
 
+        formatters = hardware_formatters(parsed_args.nested_format)
+        data = {
+            key: formatters[key](value) if key in formatters else value
+            for key, value in data.items()
+        }
         return self.dict2columns(data)
 
 
-class DeleteHardware(BaseParser):
-    """Delete specific hardware item in Doni."""
+class HardwareSelectionMixin(object):
+    """Selects the hardware a command acts on.
 
-    needs_uuid = True
+    Targets are given as names or UUIDs, or selected with --all, the worker
+    filters and --name-pattern. UUIDs are used as-is; names and filters are
+    resolved from a single listing of the inventory.
 
-    def take_action(self, parsed_args):
-        hw_client = self.app.client_manager.inventory
-        try:
-            data = oscutils.find_resource(hw_client, parsed_args.uuid)
-        except HttpError as ex:
-            LOG.error(ex.response.text)
-            raise ex
-        uuid = data["uuid"]
-        try:
-            hw_client.delete(uuid)
-        except HttpError as ex:
-            LOG.error(ex.response.text)
-            raise ex
+    Commands that set ``confirm_selection`` only act on hardware selected by
+    --all or filters when --yes is also given.
+    """
+
+    confirm_selection = False
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            dest="uuids",
+            metavar="<uuid>",
+            nargs="*",
+            help="unique ID or name of hardware item(s)",
+        )
+        parser.add_argument(
+            "--all",
+            help=(
+                "Select all hardware, from all owners. Requires admin rights. "
+                "Can be narrowed down with the worker filters."
+            ),
+            action="store_true",
+        )
+        _add_worker_filter_args(parser)
+        parser.add_argument(
+            "--name-pattern",
+            metavar="<pattern>",
+            help="Select hardware whose name matches this shell-style pattern.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            metavar="<N>",
+            type=int,
+            default=8,
+            help="Number of requests to send in parallel (default: 8).",
+        )
+        if self.confirm_selection:
+            parser.add_argument(
+                "--yes",
+                action="store_true",
+                help="Confirm acting on hardware selected by --all or filters.",
+            )
+        return parser
+
+    def matches_filters(self, hardware, parsed_args):
+        pattern = parsed_args.name_pattern
+        if pattern and not fnmatch.fnmatchcase(hardware.get("name") or "", pattern):
+            return False
+        return matches_worker_filters(
+            extract_workers_state(hardware.get("workers", [])),
+            parsed_args.worker_type,
+            parsed_args.worker_state,
+        )
 
+    def get_targets(self, hw_client, parsed_args):
+        """Return a ``(uuid, name, error)`` tuple for each selected target."""
+        use_filters = (
+            parsed_args.worker_type
+            or parsed_args.worker_state
+            or parsed_args.name_pattern
+        )
+        if parsed_args.uuids and (parsed_args.all or use_filters):
+            raise exceptions.CommandError(
+                "Specify either hardware names/UUIDs or --all/filters, not both."
+            )
+        if not parsed_args.uuids and not (parsed_args.all or use_filters):
+            raise exceptions.CommandError(
+                "Specify hardware names/UUIDs, --all, or a filter."
+            )
+
+        if not parsed_args.uuids:
+            if self.confirm_selection and not (parsed_args.dry_run or parsed_args.yes):
+                raise exceptions.CommandError(
+                    "Pass --yes to act on every hardware item selected by --all "
+                    "or filters, or --dry-run to list them first."
+                )
+            filters = {
+                field: getattr(parsed_args, field)
+                for field in ("worker_type", "worker_state")
+                if getattr(parsed_args, field)
+            }
+            if parsed_args.all:
+                data = hw_client.export(**filters)
+            else:
+                data = hw_client.list(**filters)
+            return [
+                (hardware["uuid"], hardware.get("name"), None)
+                for hardware in data
+                if self.matches_filters(hardware, parsed_args)
+            ]
+
+        names = [arg for arg in parsed_args.uuids if not is_uuid_like(arg)]
+        inventory = {}
+        if names:
+            for hardware in hw_client.list():
+                for key in (hardware.get("uuid"), hardware.get("name")):
+                    inventory.setdefault(key, []).append(hardware)
+
+        targets = []
+        for arg in parsed_args.uuids:
+            if is_uuid_like(arg):
+                targets.append((arg, None, None))
+                continue
+            matches = inventory.get(arg, [])
+            if len(matches) == 1:
+                targets.append((matches[0]["uuid"], matches[0].get("name"), None))
+            elif matches:
+                error = f"More than one resource exists with the name or ID '{arg}'."
+                targets.append((None, arg, error))
+            else:
+                targets.append((None, arg, f"Could not find resource {arg}"))
+        return targets
+
+
+class BulkHardwareCommand(
+    CheckResultsMixin, HardwareSelectionMixin, BaseParser, command.Lister
+):
+    """Base for commands that act on many hardware items at once.
+
+    The action runs for every selected target on a bounded thread pool, and
+    one row is returned per target. With --dry-run the targets are reported
+    without acting on them. The command fails after printing the table if the
+    action failed for any target.
+    """
 
-class SyncHardware(BaseParser):
-    """Sync specific hardware item in Doni."""
+    columns = ("uuid", "name", "result")
+    # Reported for targets on which the action succeeded.
+    done_result = "done"
 
-    needs_uuid = True
+    @abc.abstractmethod
+    def apply(self, hw_client, uuid):
+        """Act on the hardware item ``uuid``."""
 
     def take_action(self, parsed_args):
         hw_client = self.app.client_manager.inventory
-        try:
-            data = oscutils.find_resource(hw_client, parsed_args.uuid)
-        except HttpError as ex:
-            LOG.error(ex.response.text)
-            raise ex
-        uuid = data["uuid"]
-        try:
-            hw_client.sync(uuid)
-        except HttpError as ex:
-            LOG.error(ex.response.text)
-            raise ex
+        targets = self.get_targets(hw_client, parsed_args)
+        if len(targets) == 1 and targets[0][2]:
+            raise exceptions.CommandError(targets[0][2])
+
+        def run(target):
+            uuid, _, error = target
+            if error:
+                return error
+            if parsed_args.dry_run:
+                return "dry-run"
+            self.apply(hw_client, uuid)
+            return self.done_result
+
+        hw_client.reserve_connections(parsed_args.concurrency)
+        rows = []
+        self.failed, self.total = 0, len(targets)
+        for (uuid, name, target_error), result, error in bounded_map(
+            run, targets, parsed_args.concurrency
+        ):
+            if error is not None:
+                if isinstance(error, HttpError):
+                    LOG.error(error_text(error))
+                if len(targets) == 1:
+                    raise error
+                result = error_text(error)
+            if error is not None or target_error:
+                self.failed += 1
+            rows.append((uuid, name, result))
+        hw_client.save_name_index()
+        return self.columns, rows
+
+
+class DeleteHardware(BulkHardwareCommand):
+    """Delete one or more hardware items in Doni."""
+
+    done_result = "deleted"
+    confirm_selection = True
+
+    def apply(self, hw_client, uuid):
+        hw_client.delete(uuid)
+
+
+class SyncHardware(BulkHardwareCommand):
+    """Sync one or more hardware items in Doni."""
+
+    done_result = "synced"
+
+    def apply(self, hw_client, uuid):
+        hw_client.sync(uuid)
 
 
 def _add_prop_flag_group(parser, hardware_type, prop_flags, prog_name):
@@ -381,12 +729,13 @@ class UpdateHardware(CreateOrUpdateParser, HardwarePatchCommand):
     def take_action(self, parsed_args):
         hw_client = self.app.client_manager.inventory
         try:
-            data = oscutils.find_resource(hw_client, parsed_args.uuid)
-        except HttpError as ex:
-            LOG.error(ex.response.text)
-            raise ex
-        uuid = data["uuid"]
+            uuid = hw_client.find_uuid(parsed_args.uuid)
+        except LookupError as ex:
+            raise exceptions.CommandError(str(ex))
         patch = self.get_patch(parsed_args)
+        if parsed_args.dry_run:
+            LOG.warn(patch)
+            return
         try:
             hw_client.update(uuid, patch)
         except HttpError as ex:
@@ -394,7 +743,83 @@ class UpdateHardware(CreateOrUpdateParser, HardwarePatchCommand):
             raise ex
 
 
+def get_reconcile_patch(live, desired, prune=False):
+    """Return the JSON-Patch that brings ``live`` hardware in line with ``desired``.
+
+    Properties that differ are emitted as ``add`` operations, in the same form
+    as :meth:`UpdateHardware.get_patch`. Properties of ``live`` that are missing
+    from ``desired`` are only removed when ``prune`` is set.
+    """
+    patch = []
+    live_properties = live.get("properties") or {}
+    desired_properties = desired.get("properties") or {}
+
+    for key, val in desired_properties.items():
+        if key not in live_properties or live_properties[key] != val:
+            patch.append({"op": "add", "path": f"/properties/{key}", "value": val})
+
+    if prune:
+        for key in live_properties:
+            if key not in desired_properties:
+                patch.append({"op": "remove", "path": f"/properties/{key}"})
+
+    return patch
+
+
+class ImportJournal(object):
+    """Append-only record of the items an import has completed.
+
+    Each line is a JSON object with the ``index`` and ``name`` of an item that
+    was created (or already existed), so that an interrupted import can be
+    resumed without sending requests for those items again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Return a mapping of completed item indexes to names."""
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may be truncated if the import was killed.
+                    LOG.warning("Ignoring malformed journal line: %s", line)
+                    continue
+                completed[entry["index"]] = entry["name"]
+        return completed
+
+    def record(self, index, name, uuid=None):
+        entry = json.dumps({"index": index, "name": name, "uuid": uuid})
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(entry + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 class ImportHardware(BaseParser):
+    """Create hardware items in bulk from a JSON or NDJSON file.
+
+    The file may be gzip or zstd compressed. It is decoded incrementally and
+    each item is submitted as soon as it has been read, so memory use does not
+    grow with the size of the file. With --reconcile, items that already exist
+    are compared with the live inventory and only the differences are sent as
+    a PATCH. One line is written per item with its index, outcome and name,
+    followed by the new UUID or the error returned by Doni.
+    """
+
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
         parser.add_argument(
@@ -402,26 +827,336 @@ class ImportHardware(BaseParser):
             help="continue if an item already exists, rather than exiting",
             action="store_true",
         )
-        parser.add_argument("-f", "--file", help="JSON input file", type=FileType("r"))
+        parser.add_argument(
+            "-f",
+            "--file",
+            help=(
+                "JSON (array) or NDJSON input file, optionally gzip or zstd "
+                "compressed, '-' for stdin"
+            ),
+            type=FileType("rb"),
+        )
+        parser.add_argument(
+            "--concurrency",
+            metavar="<N>",
+            type=int,
+            default=1,
+            help="Number of items to create in parallel (default: 1).",
+        )
+        parser.add_argument(
+            "--summary",
+            metavar="<summary_file>",
+            type=FileType("w"),
+            help=(
+                "Write a JSON summary of created, skipped and failed items "
+                "to this file."
+            ),
+        )
+        parser.add_argument(
+            "--reconcile",
+            action="store_true",
+            help=(
+                "Fetch the existing inventory once and, for items that already "
+                "exist, only send a PATCH for the properties that differ."
+            ),
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help=(
+                "With --reconcile, also remove properties that are not present "
+                "in the input file."
+            ),
+        )
+        parser.add_argument(
+            "--journal",
+            metavar="<journal_file>",
+            help=(
+                "Append the index and name of every completed item to this "
+                "file, so that the import can be continued with --resume."
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Skip items already recorded in the --journal file without "
+                "sending any request for them."
+            ),
+        )
         return parser
 
+    def report(self, index, status, name, detail=None):
+        self.app.stdout.write(f"{index}\t{status}\t{name}\t{detail or ''}\n")
+
+    def create(self, hw_client, item, skip_existing=False):
+        try:
+            data = hw_client.create(item)
+        except Conflict as ex:
+            LOG.error(ex.response.text)
+            if skip_existing:
+                return "skipped", None
+            raise
+        LOG.debug(data)
+        return "created", data
+
+    def load_inventory(self, hw_client):
+        """Index the existing hardware by name, for --reconcile.
+
+        Hardware of every project is included when the user may export it,
+        so that items owned by other projects are not created again.
+        """
+        try:
+            hardware = hw_client.export()
+        except (Forbidden, NotFound):
+            hardware = hw_client.list()
+        inventory = {}
+        for item in hardware:
+            inventory.setdefault(item.get("name"), []).append(item)
+        return inventory
+
+    def plan_reconcile(self, inventory, item, prune=False):
+        """Return the existing hardware matching ``item`` and the patch for it.
+
+        The hardware is None if ``item`` does not exist yet.
+        """
+        name = item.get("name")
+        matches = inventory.get(name, [])
+        if not matches:
+            return None, None
+        if len(matches) > 1:
+            raise exceptions.CommandError(
+                f"More than one hardware item exists with the name '{name}'."
+            )
+        live = matches[0]
+        hw_type = item.get("hardware_type")
+        if hw_type and hw_type != live.get("hardware_type"):
+            raise exceptions.CommandError(
+                f"Hardware '{name}' is of type '{live.get('hardware_type')}', "
+                f"not '{hw_type}'."
+            )
+        return live, get_reconcile_patch(live, item, prune=prune)
+
+    def reconcile(self, hw_client, inventory, item, prune=False, skip_existing=False):
+        live, patch = self.plan_reconcile(inventory, item, prune=prune)
+        if live is None:
+            return self.create(hw_client, item, skip_existing=skip_existing)
+        if not patch:
+            return "unchanged", live
+        LOG.debug(f"PATCH_BODY: {patch}")
+        return "updated", hw_client.update(live["uuid"], patch)
+
+    def dry_run(self, items, inventory=None, prune=False):
+        """Report what the import would do, without sending any request."""
+        for index, item in items:
+            name = item.get("name")
+            if inventory is None:
+                LOG.warn(item)
+                continue
+            live, patch = self.plan_reconcile(inventory, item, prune=prune)
+            if live is None:
+                self.report(index, "create", name, json.dumps(item))
+            elif patch:
+                self.report(index, "update", name, json.dumps(patch))
+            else:
+                self.report(index, "unchanged", name, live.get("uuid"))
+
     def take_action(self, parsed_args):
         hw_client = self.app.client_manager.inventory
-        with parsed_args.file as f:
-            for item in json.load(f):
-                if parsed_args.dry_run:
-                    LOG.warn(item)
+        summary = {
+            "created": [],
+            "updated": [],
+            "unchanged": [],
+            "skipped": [],
+            "failed": [],
+        }
+        errors = []
+
+        if parsed_args.resume and not parsed_args.journal:
+            raise exceptions.CommandError("--resume requires --journal")
+        journal = ImportJournal(parsed_args.journal) if parsed_args.journal else None
+        completed = journal.load() if parsed_args.resume else {}
+
+        inventory = None
+        if parsed_args.reconcile:
+            inventory = self.load_inventory(hw_client)
+
+        def apply(indexed_item):
+            index, item = indexed_item
+            if inventory is not None:
+                status, data = self.reconcile(
+                    hw_client,
+                    inventory,
+                    item,
+                    prune=parsed_args.prune,
+                    skip_existing=parsed_args.skip_existing,
+                )
+            else:
+                status, data = self.create(
+                    hw_client, item, skip_existing=parsed_args.skip_existing
+                )
+            if journal:
+                uuid = data.get("uuid") if isinstance(data, dict) else None
+                journal.record(index, item.get("name"), uuid)
+            return status, data
+
+        def pending(items):
+            for index, item in items:
+                name = item.get("name")
+                if index not in completed:
+                    yield index, item
+                elif completed[index] == name:
+                    summary["skipped"].append({"index": index, "name": name})
+                    self.report(index, "skipped", name, "journal")
                 else:
-                    try:
-                        data = hw_client.create(item)
-                    except Conflict as ex:
-                        LOG.error(ex.response.text)
-                        if parsed_args.skip_existing:
-                            continue
-                        else:
-                            raise ex
-                    else:
-                        LOG.debug(data)
+                    raise exceptions.CommandError(
+                        f"Item {index} is '{name}' but the journal recorded "
+                        f"'{completed[index]}'; the input file has changed."
+                    )
+
+        with parsed_args.file as f:
+            chunks = iter_binary_file_chunks(open_reader(f))
+            items = pending(enumerate(iter_json_items(chunks)))
+
+            if parsed_args.dry_run:
+                self.dry_run(items, inventory, prune=parsed_args.prune)
+                return
+
+            hw_client.reserve_connections(parsed_args.concurrency)
+            # Stop reading new items after the first error, but still collect
+            # the results of requests that are already in flight.
+            items = itertools.takewhile(lambda _: not errors, items)
+            results = bounded_map(apply, items, parsed_args.concurrency)
+            try:
+                for (index, item), result, error in results:
+                    name = item.get("name")
+                    if error is not None:
+                        errors.append(error)
+                        detail = error_text(error)
+                        summary["failed"].append(
+                            {"index": index, "name": name, "error": detail}
+                        )
+                        self.report(index, "failed", name, detail)
+                        continue
+                    status, data = result
+                    uuid = data.get("uuid") if isinstance(data, dict) else None
+                    summary[status].append({"index": index, "name": name, "uuid": uuid})
+                    self.report(index, status, name, uuid)
+            finally:
+                hw_client.save_name_index()
+                if journal:
+                    journal.close()
+                if parsed_args.summary:
+                    with parsed_args.summary as summary_file:
+                        json.dump(summary, summary_file, indent=2)
+
+        if errors:
+            raise errors[0]
+
+
+# Fields of exported hardware that can be sent back to create it.
+IMPORT_FIELDS = ["name", "hardware_type", "properties"]
+
+
+def project_fields(item, fields):
+    """Return a copy of ``item`` with only ``fields``.
+
+    Fields may use dot notation to select nested values, e.g.
+    ``properties.management_address``; missing fields are left out.
+    """
+    projected = {}
+    for field in fields:
+        source, target = item, projected
+        *parents, key = field.split(".")
+        for parent in parents:
+            source = source.get(parent) if isinstance(source, dict) else None
+            target = target.setdefault(parent, {})
+        if isinstance(source, dict) and key in source:
+            target[key] = source[key]
+    return projected
+
+
+class ExportHardware(BaseParser):
+    """Export hardware items as NDJSON, one JSON object per line.
+
+    Records are written as they are received from Doni, without being held in
+    memory or formatted as table rows. By default only the fields accepted by
+    ``openstack hardware import`` are exported, so the output can be read back
+    directly.
+    """
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "-o",
+            "--output",
+            metavar="<file>",
+            default="-",
+            help="File to write to, '-' for stdout (default)",
+        )
+        parser.add_argument(
+            "--compress",
+            choices=COMPRESSIONS,
+            help=(
+                "Compress the output. By default this is guessed from the "
+                "output file suffix (.gz or .zst)."
+            ),
+        )
+        fields_group = parser.add_mutually_exclusive_group()
+        fields_group.add_argument(
+            "--fields",
+            metavar="<fields>",
+            type=lambda value: [f for f in value.split(",") if f],
+            default=IMPORT_FIELDS,
+            help=(
+                "Comma-separated fields to export. Dot notation selects nested "
+                f"fields. Defaults to '{','.join(IMPORT_FIELDS)}', which can "
+                "be imported again."
+            ),
+        )
+        fields_group.add_argument(
+            "--all-fields",
+            action="store_true",
+            help=(
+                "Export whole records, including read-only fields such as uuid "
+                "and workers that import does not accept."
+            ),
+        )
+        parser.add_argument(
+            "--page-size",
+            metavar="<N>",
+            type=int,
+            help=(
+                "Fetch hardware from the server N items at a time. "
+                "By default everything is fetched in one request."
+            ),
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        hw_client = self.app.client_manager.inventory
+        compression = parsed_args.compress
+        if compression is None and parsed_args.output != "-":
+            compression = compression_for_path(parsed_args.output)
+
+        if parsed_args.output == "-":
+            fp = getattr(self.app.stdout, "buffer", self.app.stdout)
+            close = fp.flush
+        else:
+            fp = open(parsed_args.output, "wb")
+            close = fp.close
+
+        try:
+            writer = open_writer(fp, compression)
+            try:
+                for item in hw_client.iter_export(page_size=parsed_args.page_size):
+                    if not parsed_args.all_fields:
+                        item = project_fields(item, parsed_args.fields)
+                    writer.write(json.dumps(item).encode("utf-8") + b"\n")
+            finally:
+                writer.close()
+        finally:
+            close()
 
 
 class UnsetHardware(UpdateHardware):
@@ -1,17 +1,26 @@
 import argparse
+import functools
 import json
 import logging
 from argparse import Namespace
 
-import yaml
 from cliff.columns import FormattableColumn
 from keystoneauth1.exceptions import HttpError
+from osc_lib import exceptions
 from osc_lib import utils as osc_utils
 from osc_lib.command import command
 
 LOG = logging.getLogger(__name__)  # Get the logger of this module
 
 
+def error_text(ex):
+    """Return the most useful description of a failed request."""
+    response = getattr(ex, "response", None)
+    if response is not None:
+        return response.text
+    return str(ex)
+
+
 class OutputFormat:
     columns = (
         "uuid",
@@ -22,20 +31,80 @@ class OutputFormat:
     )
 
 
+# Number of distinct values whose YAML rendering is remembered. Many hardware
+# items share identical properties, e.g. interfaces or capabilities.
+YAML_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _yaml_dumper():
+    import yaml
+
+    # The libyaml emitter is much faster than the pure Python one.
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+@functools.lru_cache(maxsize=YAML_CACHE_SIZE)
+def _render_yaml(json_text):
+    import yaml
+
+    return yaml.dump(json.loads(json_text), Dumper=_yaml_dumper())
+
+
 class YamlColumn(FormattableColumn):
     def human_readable(self):
-        return yaml.dump(self._value)
+        try:
+            # Serialized JSON is a cheap, hashable key for the rendering.
+            key = json.dumps(self._value, sort_keys=True)
+        except (TypeError, ValueError):
+            import yaml
+
+            return yaml.dump(self._value, Dumper=_yaml_dumper())
+        return _render_yaml(key)
+
+
+class JsonColumn(FormattableColumn):
+    """Render nested values as compact, single-line JSON, for wide tables."""
+
+    def human_readable(self):
+        return json.dumps(self._value, sort_keys=True, separators=(",", ":"))
+
+
+NESTED_FORMATS = {
+    "yaml": YamlColumn,
+    "json": JsonColumn,
+}
+
+
+def hardware_formatters(nested_format="yaml"):
+    """Return the column formatters for the nested fields of hardware.
+
+    With no ``nested_format`` the values are left as they are.
+    """
+    if nested_format is None:
+        return {}
+    column = NESTED_FORMATS[nested_format]
+    return {
+        "properties": column,
+        "workers": column,
+    }
+
+
+def add_nested_format_arg(parser):
+    parser.add_argument(
+        "--nested-format",
+        choices=list(NESTED_FORMATS),
+        help=(
+            "Display properties and workers in tables as YAML, or as compact "
+            "single-line JSON for wide tables."
+        ),
+    )
 
 
 class HardwareSerializer(object):
     def serialize_hardware(self, hw_dict: "dict", columns: "list[str]"):
         return osc_utils.get_dict_properties(
-            hw_dict,
-            columns,
-            formatters={
-                "properties": YamlColumn,
-                "workers": YamlColumn,
-            },
+            hw_dict, columns, formatters=hardware_formatters()
         )
 
 
@@ -74,7 +143,61 @@ class ExpandDotNotationAndStoreTrue(argparse.Action):
         getattr(namespace, group).update({dest: True})
 
 
-class BaseParser(command.Command):
+class CacheOptionsMixin(object):
+    """Adds per-command control over the inventory client's response cache."""
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        cache_group = parser.add_mutually_exclusive_group()
+        cache_group.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Do not read or write cached inventory responses.",
+        )
+        cache_group.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Revalidate cached inventory responses regardless of their age.",
+        )
+        return parser
+
+    def apply_cache_options(self, parsed_args):
+        hw_client = self.app.client_manager.inventory
+        if getattr(hw_client, "cache", None):
+            if parsed_args.no_cache:
+                hw_client.cache = None
+            elif parsed_args.refresh:
+                hw_client.cache.refresh = True
+
+    def run(self, parsed_args):
+        self.apply_cache_options(parsed_args)
+        return super().run(parsed_args)
+
+
+class CheckResultsMixin(object):
+    """Fails a command that acts on many hardware items if any of them failed.
+
+    ``take_action`` counts the ``failed`` targets out of ``total``; the error
+    is raised from ``run`` so that the results are still printed.
+    """
+
+    failed = 0
+    total = 0
+
+    def run(self, parsed_args):
+        result = super().run(parsed_args)
+        self.check_results()
+        return result
+
+    def check_results(self):
+        """Raise CommandError if the last take_action failed for any target."""
+        if self.failed:
+            raise exceptions.CommandError(
+                f"{self.failed} of {self.total} hardware items failed."
+            )
+
+
+class BaseParser(CacheOptionsMixin, command.Command):
     """Base Parser for use with Doni commands.
 
     Behavior is to take arguments in the following forms, with later ones
@@ -122,11 +245,21 @@ class HardwarePatchCommand(BaseParser, HardwareSerializer):
     def get_patch(self, parsed_args):
         return []
 
+    def validate(self, hw_client, parsed_args, patch):
+        """Check the patch before it is sent; raise CommandError if invalid."""
+
     def take_action(self, parsed_args):
         hw_client = self.app.client_manager.inventory
-        hw_uuid = parsed_args.uuid
+        try:
+            hw_uuid = hw_client.find_uuid(parsed_args.uuid)
+        except LookupError as ex:
+            raise exceptions.CommandError(str(ex))
+        # Subclasses build the patch from the resolved UUID.
+        parsed_args.uuid = hw_uuid
 
         patch = self.get_patch(parsed_args)
+        if patch:
+            self.validate(hw_client, parsed_args, patch)
 
         if parsed_args.dry_run:
             LOG.warn(patch)
@@ -1,9 +1,14 @@
 """Module for OpenStackClient Integration."""
 import logging
 
-from keystoneauth1 import adapter
 from osc_lib import utils
 
+from doniclient.v1.defaults import (
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_TTL,
+)
+
 LOG = logging.getLogger(__name__)  # Get the logger of this module
 
 DEFAULT_API_VERSION = "1"
@@ -16,6 +21,13 @@ API_VERSION_OPTION = "os_inventory_api_version"
 API_VERSIONS = {
     "1": "doniclient.v1.client.Client",
 }
+
+def _bool_option(value):
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
 # Required by the OSC plugin interface
 def make_client(instance):
     """Returns a client to the ClientManager.
@@ -25,6 +37,12 @@ def make_client(instance):
 
     :param ClientManager instance: The ClientManager that owns the new client
     """
+    # This module is loaded on every openstack invocation, so dependencies of
+    # the client are only imported once it is actually needed.
+    from keystoneauth1 import adapter
+
+    from doniclient.v1.cache import ResponseCache
+
     version = instance._api_version[API_NAME]
     inventory_client = utils.get_client_class(
         api_name=API_NAME,
@@ -38,7 +56,23 @@ def make_client(instance):
         session=instance.session, service_type="inventory", interface="public"
     )
 
-    client = inventory_client(adapter=ksa_adapter)
+    config = instance.get_configuration()
+    cache = None
+    if _bool_option(config.get("inventory_cache")):
+        ttl = config.get("inventory_cache_ttl") or DEFAULT_TTL
+        cache = ResponseCache(ttl=float(ttl))
+
+    pool_connections = config.get("inventory_pool_connections")
+    pool_maxsize = config.get("inventory_pool_maxsize")
+    keepalive = config.get("inventory_keepalive")
+
+    client = inventory_client(
+        adapter=ksa_adapter,
+        cache=cache,
+        pool_connections=int(pool_connections) if pool_connections else None,
+        pool_maxsize=int(pool_maxsize) if pool_maxsize else None,
+        keepalive=_bool_option(keepalive) if keepalive else True,
+    )
 
     return client
 
@@ -61,4 +95,43 @@ def build_option_parser(parser):
         + DEFAULT_API_VERSION
         + " (Env: OS_OSCPLUGIN_API_VERSION)",
     )
+    parser.add_argument(
+        "--os-inventory-cache",
+        action="store_true",
+        default=utils.env("OS_INVENTORY_CACHE"),
+        help="Cache inventory responses on disk and revalidate them with "
+        "conditional requests (Env: OS_INVENTORY_CACHE)",
+    )
+    parser.add_argument(
+        "--os-inventory-cache-ttl",
+        metavar="<seconds>",
+        type=float,
+        default=utils.env("OS_INVENTORY_CACHE_TTL"),
+        help="Seconds a cached inventory response is used without "
+        f"revalidation, default={DEFAULT_TTL} (Env: OS_INVENTORY_CACHE_TTL)",
+    )
+    parser.add_argument(
+        "--os-inventory-pool-connections",
+        metavar="<N>",
+        type=int,
+        default=utils.env("OS_INVENTORY_POOL_CONNECTIONS"),
+        help="Number of per-host HTTP connection pools to keep, "
+        f"default={DEFAULT_POOL_CONNECTIONS} (Env: OS_INVENTORY_POOL_CONNECTIONS)",
+    )
+    parser.add_argument(
+        "--os-inventory-pool-maxsize",
+        metavar="<N>",
+        type=int,
+        default=utils.env("OS_INVENTORY_POOL_MAXSIZE"),
+        help="Maximum number of connections kept open per host, raised "
+        "automatically to match --concurrency, "
+        f"default={DEFAULT_POOL_MAXSIZE} (Env: OS_INVENTORY_POOL_MAXSIZE)",
+    )
+    parser.add_argument(
+        "--os-inventory-keepalive",
+        metavar="<true|false>",
+        default=utils.env("OS_INVENTORY_KEEPALIVE"),
+        help="Enable TCP keep-alive on inventory connections, default=true "
+        "(Env: OS_INVENTORY_KEEPALIVE)",
+    )
     return parser
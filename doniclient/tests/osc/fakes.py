@@ -58,6 +58,8 @@ class TestHardware(utils.TestCommand):
 
         self.app.client_manager.auth_ref = mock.Mock(auth_token="TOKEN")
         self.app.client_manager.inventory = mock.Mock()
+        # Names are resolved by the client; UUIDs are returned as-is.
+        self.app.client_manager.inventory.find_uuid.side_effect = lambda arg: arg
 
 
 class FakeHardwareResource(fakes.FakeResource):
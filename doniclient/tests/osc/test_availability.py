@@ -0,0 +1,469 @@
+import json
+import os
+import tempfile
+import unittest
+from argparse import ArgumentTypeError
+from datetime import datetime, timedelta, timezone
+
+from dateutil import tz
+from osc_lib import exceptions
+
+from doniclient.osc import availability as availability_cli
+from doniclient.tests.osc import fakes as hardware_fakes
+
+UUIDS = [f"00000000-0000-0000-0000-{n:012d}" for n in range(3)]
+
+
+def _window(n, start, end):
+    return {"uuid": f"window-{n}", "start": start, "end": end}
+
+
+class TestFlexibleDatetime(unittest.TestCase):
+    def test_iso(self):
+        expected = datetime(2021, 8, 3, 6, tzinfo=timezone.utc)
+        for value in ("2021-08-03T06:00:00+00:00", "2021-08-03T06:00Z"):
+            self.assertEqual(expected, availability_cli.flexible_datetime(value))
+        self.assertEqual(
+            timedelta(hours=2),
+            availability_cli.flexible_datetime("2021-08-03T06:00+02:00").utcoffset(),
+        )
+
+    def test_naive_is_local(self):
+        parsed = availability_cli.flexible_datetime("2021-08-03 06:00")
+        self.assertEqual(datetime(2021, 8, 3, 6, tzinfo=tz.gettz()), parsed)
+
+    def test_fallback(self):
+        self.assertEqual(
+            datetime(2021, 8, 3, tzinfo=tz.gettz()),
+            availability_cli.flexible_datetime("Aug 3 2021"),
+        )
+
+    def test_invalid(self):
+        for value in ("", "not a date"):
+            self.assertRaises(
+                ArgumentTypeError, availability_cli.flexible_datetime, value
+            )
+
+
+class TestHardwareAvailability(hardware_fakes.TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.hardware_mock = self.app.client_manager.inventory
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.list.return_value = [
+            hardware_fakes.FakeHardware.create_one_hardware(
+                {"uuid": uuid, "name": f"node-{n}"}
+            )
+            for n, uuid in enumerate(UUIDS)
+        ]
+        self.hardware_mock.export.return_value = self.hardware_mock.list.return_value
+        self.availability = {
+            UUIDS[0]: [
+                _window(0, "2021-08-01T00:00:00+00:00", "2021-08-02T00:00:00+00:00"),
+                _window(1, "2021-08-02T00:00:00+00:00", "2021-08-03T00:00:00+00:00"),
+            ],
+            UUIDS[1]: [
+                _window(2, "2021-08-01T12:00:00+00:00", "2021-08-02T00:00:00+00:00")
+            ],
+            UUIDS[2]: [],
+        }
+        self.hardware_mock.get_availability_many.side_effect = lambda uuids, **kw: (
+            {uuid: self.availability[uuid] for uuid in uuids},
+            {},
+        )
+        self.cmd = availability_cli.ListHardwareAvailability(self.app, None)
+
+    def _run(self, arglist):
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+        columns, data = self.cmd.take_action(parsed_args)
+        return columns, list(data)
+
+    def test_single_hardware(self):
+        columns, data = self._run([UUIDS[1]])
+
+        self.assertEqual(("uuid", "start", "end"), columns)
+        self.assertEqual(
+            [("window-2", "2021-08-01T12:00:00+00:00", "2021-08-02T00:00:00+00:00")],
+            data,
+        )
+        self.hardware_mock.list.assert_not_called()
+
+    def test_all_hardware(self):
+        columns, data = self._run(["--all"])
+
+        self.assertEqual(
+            ("hardware_uuid", "hardware_name", "uuid", "start", "end"), columns
+        )
+        self.assertEqual([UUIDS[0], UUIDS[0], UUIDS[1]], [row[0] for row in data])
+        self.hardware_mock.get_availability_many.assert_called_once_with(
+            UUIDS, concurrency=8
+        )
+
+    def test_query_range(self):
+        columns, data = self._run(
+            ["--all", "--start", "2021-08-01T18:00Z", "--end", "2021-08-02T06:00Z"]
+        )
+
+        self.assertEqual(("uuid", "name", "status"), columns)
+        self.assertEqual(
+            [
+                (UUIDS[0], "node-0", "available"),
+                (UUIDS[1], "node-1", "partial"),
+                (UUIDS[2], "node-2", "unavailable"),
+            ],
+            data,
+        )
+
+    def test_query_range_status_filter(self):
+        columns, data = self._run(
+            [
+                "--name-pattern",
+                "node-*",
+                "--start",
+                "2021-08-01T18:00Z",
+                "--end",
+                "2021-08-02T06:00Z",
+                "--status",
+                "available",
+            ]
+        )
+
+        self.assertEqual([(UUIDS[0], "node-0", "available")], data)
+
+    def test_failed_hardware_fails_command(self):
+        self.hardware_mock.get_availability_many.side_effect = lambda uuids, **kw: (
+            {UUIDS[0]: self.availability[UUIDS[0]]},
+            {UUIDS[1]: Exception("timed out")},
+        )
+        arglist = ["node-0", UUIDS[1], "missing", "-f", "value"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        with self.assertLogs(availability_cli.LOG, "ERROR") as logs:
+            self.assertRaisesRegex(
+                exceptions.CommandError,
+                "2 of 3 hardware items failed",
+                self.cmd.run,
+                parsed_args,
+            )
+
+        # The windows of the other hardware are still printed first.
+        self.assertEqual(2, len(self.app.stdout.content))
+        self.assertIn(f"{UUIDS[1]}: timed out", logs.output[0])
+        self.assertIn("missing", logs.output[1])
+
+    def test_query_range_reports_failed_hardware(self):
+        self.hardware_mock.get_availability_many.side_effect = lambda uuids, **kw: (
+            {UUIDS[0]: self.availability[UUIDS[0]]},
+            {UUIDS[1]: Exception("timed out")},
+        )
+        arglist = [
+            "node-0",
+            UUIDS[1],
+            "--start",
+            "2021-08-01T18:00Z",
+            "--end",
+            "2021-08-02T06:00Z",
+        ]
+
+        columns, data = self._run(arglist)
+
+        self.assertEqual(
+            [(UUIDS[0], "node-0", "available"), (UUIDS[1], None, "timed out")],
+            data,
+        )
+        self.assertRaises(exceptions.CommandError, self.cmd.check_results)
+
+    def test_query_range_requires_both_ends(self):
+        parsed_args = self.check_parser(
+            self.cmd, ["--all", "--start", "2021-08-01"], []
+        )
+        self.assertRaises(exceptions.CommandError, self.cmd.take_action, parsed_args)
+
+
+class TestHardwareAvailabilityChange(hardware_fakes.TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.hardware_mock = self.app.client_manager.inventory
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.update.return_value = (
+            hardware_fakes.FakeHardware.create_one_hardware()
+        )
+        self.hardware_mock.get_availability.return_value = [
+            _window(0, "2021-08-01T00:00:00+00:00", "2021-08-02T00:00:00+00:00"),
+            _window(1, "2021-08-05T00:00:00+00:00", "2021-08-06T00:00:00+00:00"),
+        ]
+
+    def _run(self, cmd_class, arglist):
+        cmd = cmd_class(self.app, None)
+        parsed_args = self.check_parser(cmd, arglist, [])
+        return cmd.take_action(parsed_args)
+
+    def test_add(self):
+        self._run(
+            availability_cli.AddHardwareAvailability,
+            [UUIDS[0], "--start", "2021-08-02T00:00Z", "--end", "2021-08-03T00:00Z"],
+        )
+
+        self.hardware_mock.get_availability.assert_called_once_with(UUIDS[0])
+        self.hardware_mock.update.assert_called_once()
+
+    def test_add_overlapping(self):
+        self.assertRaisesRegex(
+            exceptions.CommandError,
+            "window-0",
+            self._run,
+            availability_cli.AddHardwareAvailability,
+            [UUIDS[0], "--start", "2021-08-01T12:00Z", "--end", "2021-08-03T00:00Z"],
+        )
+        self.hardware_mock.update.assert_not_called()
+
+    def test_add_skip_validation(self):
+        self._run(
+            availability_cli.AddHardwareAvailability,
+            [
+                UUIDS[0],
+                "--start",
+                "2021-08-01T12:00Z",
+                "--end",
+                "2021-08-03T00:00Z",
+                "--skip-validation",
+            ],
+        )
+
+        self.hardware_mock.get_availability.assert_not_called()
+        self.hardware_mock.update.assert_called_once()
+
+    def test_set(self):
+        self._run(
+            availability_cli.UpdateHardwareAvailability,
+            [UUIDS[0], "window-1", "--start", "2021-08-04T00:00Z"],
+        )
+
+        self.hardware_mock.update.assert_called_once()
+
+    def test_set_overlapping(self):
+        self.assertRaises(
+            exceptions.CommandError,
+            self._run,
+            availability_cli.UpdateHardwareAvailability,
+            [UUIDS[0], "window-1", "--start", "2021-08-01T12:00Z"],
+        )
+        self.hardware_mock.update.assert_not_called()
+
+    def test_remove(self):
+        self._run(availability_cli.RemoveHardwareAvailability, [UUIDS[0], "window-1"])
+
+        self.hardware_mock.update.assert_called_once_with(
+            UUIDS[0], [{"op": "remove", "path": "/availability/window-1"}]
+        )
+
+
+class TestHardwareAvailabilityApply(hardware_fakes.TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.hardware_mock = self.app.client_manager.inventory
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.find_uuid.side_effect = lambda name: UUIDS[
+            int(name.split("-")[1])
+        ]
+        self.availability = {
+            UUIDS[0]: [
+                _window(0, "2021-08-01T00:00:00+00:00", "2021-08-02T00:00:00+00:00")
+            ],
+            UUIDS[1]: [],
+        }
+        self.hardware_mock.get_availability_many.side_effect = lambda uuids, **kw: (
+            {uuid: self.availability[uuid] for uuid in uuids},
+            {},
+        )
+        self.cmd = availability_cli.ApplyHardwareAvailability(self.app, None)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+    def _run(self, filename, content, *args):
+        path = os.path.join(self.tmpdir, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        parsed_args = self.check_parser(self.cmd, ["--file", path, *args], [])
+        columns, data = self.cmd.take_action(parsed_args)
+        return columns, list(data)
+
+    def test_apply_csv(self):
+        columns, data = self._run(
+            "windows.csv",
+            "hardware,op,window,start,end\n"
+            f"{UUIDS[0]},add,,2021-08-03T00:00Z,2021-08-04T00:00Z\n"
+            f"{UUIDS[0]},remove,window-0,,\n"
+            "node-1,add,,2021-08-01T00:00Z,2021-08-02T00:00Z\n",
+        )
+
+        self.assertEqual(("uuid", "name", "operations", "result"), columns)
+        self.assertEqual(
+            [(UUIDS[0], None, 2, "applied"), (UUIDS[1], "node-1", 1, "applied")], data
+        )
+        self.hardware_mock.update.assert_any_call(
+            UUIDS[0],
+            [
+                {
+                    "op": "add",
+                    "path": "/availability/-",
+                    "value": {
+                        "start": "2021-08-03T00:00:00+00:00",
+                        "end": "2021-08-04T00:00:00+00:00",
+                    },
+                },
+                {"op": "remove", "path": "/availability/window-0"},
+            ],
+        )
+        self.assertEqual(2, self.hardware_mock.update.call_count)
+        self.cmd.check_results()
+
+    def test_apply_json_dry_run(self):
+        changes = [
+            {
+                "hardware": UUIDS[0],
+                "op": "set",
+                "window": "window-0",
+                "end": "2021-08-05T00:00Z",
+            }
+        ]
+        _, data = self._run("windows.json", json.dumps(changes), "--dry-run")
+
+        self.assertEqual(
+            [
+                {
+                    "op": "replace",
+                    "path": "/availability/window-0/end",
+                    "value": "2021-08-05T00:00:00+00:00",
+                }
+            ],
+            json.loads(data[0][3]),
+        )
+        self.hardware_mock.update.assert_not_called()
+
+    def test_apply_rejects_overlaps_per_node(self):
+        _, data = self._run(
+            "windows.ndjson",
+            json.dumps(
+                {
+                    "hardware": UUIDS[0],
+                    "start": "2021-08-01T12:00Z",
+                    "end": "2021-08-03T00:00Z",
+                }
+            )
+            + "\n"
+            + json.dumps(
+                {
+                    "hardware": UUIDS[1],
+                    "start": "2021-08-01T12:00Z",
+                    "end": "2021-08-03T00:00Z",
+                }
+            ),
+        )
+
+        self.assertIn("window-0", data[0][3])
+        self.assertEqual("applied", data[1][3])
+        self.hardware_mock.update.assert_called_once()
+        self.assertRaisesRegex(
+            exceptions.CommandError,
+            "1 of 2 hardware items failed",
+            self.cmd.check_results,
+        )
+
+    def test_apply_failures_fail_command(self):
+        def find_uuid(name):
+            raise LookupError(f"No hardware exists with the name '{name}'.")
+
+        self.hardware_mock.find_uuid.side_effect = find_uuid
+        self.hardware_mock.get_availability_many.side_effect = lambda uuids, **kw: (
+            {UUIDS[0]: []},
+            {UUIDS[1]: Exception("unavailable")},
+        )
+        path = os.path.join(self.tmpdir, "windows.csv")
+        with open(path, "w") as f:
+            f.write(
+                "hardware,start,end\n"
+                f"{UUIDS[0]},2021-08-03T00:00Z,2021-08-04T00:00Z\n"
+                f"{UUIDS[1]},2021-08-03T00:00Z,2021-08-04T00:00Z\n"
+                "missing,2021-08-03T00:00Z,2021-08-04T00:00Z\n"
+            )
+        parsed_args = self.check_parser(self.cmd, ["--file", path, "-f", "value"], [])
+
+        self.assertRaisesRegex(
+            exceptions.CommandError,
+            "2 of 3 hardware items failed",
+            self.cmd.run,
+            parsed_args,
+        )
+        # The results are still printed first.
+        output = "".join(self.app.stdout.content)
+        self.assertIn("unavailable", output)
+        self.assertIn("No hardware exists with the name 'missing'.", output)
+        self.hardware_mock.update.assert_called_once()
+
+    def test_apply_invalid_change(self):
+        self.assertRaises(
+            exceptions.CommandError,
+            self._run,
+            "windows.json",
+            json.dumps([{"hardware": UUIDS[0], "op": "remove"}]),
+        )
+
+
+class TestHardwareAvailabilityRecurring(hardware_fakes.TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.hardware_mock = self.app.client_manager.inventory
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.update.return_value = (
+            hardware_fakes.FakeHardware.create_one_hardware()
+        )
+        # Covers the second occurrence of the rule used below.
+        self.hardware_mock.get_availability.return_value = [
+            _window(0, "2021-08-17T00:00:00+00:00", "2021-08-18T00:00:00+00:00"),
+        ]
+        self.cmd = availability_cli.AddHardwareAvailability(self.app, None)
+
+    def _run(self, *args):
+        arglist = [
+            UUIDS[0],
+            "--start",
+            "2021-08-03T06:00Z",
+            "--end",
+            "2021-08-03T10:00Z",
+            "--rrule",
+            "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU",
+            *args,
+        ]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+        return self.cmd.take_action(parsed_args)
+
+    def test_rrule_expands_missing_occurrences(self):
+        self._run("--horizon", "42")
+
+        self.hardware_mock.get_availability.assert_called_once_with(UUIDS[0])
+        uuid, patch = self.hardware_mock.update.call_args.args
+        self.assertEqual(UUIDS[0], uuid)
+        self.assertEqual(
+            ["2021-08-03T06:00:00+00:00", "2021-08-31T06:00:00+00:00"],
+            [op["value"]["start"].isoformat() for op in patch],
+        )
+        self.assertEqual(
+            "2021-08-31T10:00:00+00:00", patch[1]["value"]["end"].isoformat()
+        )
+
+    def test_rrule_nothing_missing(self):
+        self._run("--horizon", "14")
+        self._run("--horizon", "0")
+
+        self.hardware_mock.update.assert_called_once()
+
+    def test_invalid_rrule(self):
+        self.hardware_mock.get_availability.return_value = []
+        parsed_args = self.check_parser(
+            self.cmd,
+            [UUIDS[0], "--start", "2021-08-03", "--end", "2021-08-04", "--rrule", "X"],
+            [],
+        )
+        self.assertRaises(exceptions.CommandError, self.cmd.take_action, parsed_args)
@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+import threading
+
+from osc_lib import exceptions
+
+from doniclient.osc import batch as batch_cli
+from doniclient.tests.osc import fakes as hardware_fakes
+
+UUIDS = [f"00000000-0000-0000-0000-{n:012d}" for n in range(3)]
+
+
+class TestHardwareBatch(hardware_fakes.TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.hardware_mock = self.app.client_manager.inventory
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.get.side_effect = lambda uuid: (
+            hardware_fakes.FakeHardware.create_one_hardware({"uuid": uuid})
+        )
+        self.hardware_mock.update.return_value = (
+            hardware_fakes.FakeHardware.create_one_hardware()
+        )
+        self.hardware_mock.get_availability.return_value = []
+        self.cmd = batch_cli.BatchHardware(self.app, None)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+    def _run(self, lines, *args):
+        path = os.path.join(self.tmpdir, "commands")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        parsed_args = self.check_parser(self.cmd, ["--file", path, *args], [])
+        return self.cmd.take_action(parsed_args)
+
+    def _report(self):
+        output = "".join(self.app.stdout.content)
+        return [line.split("\t") for line in output.splitlines()]
+
+    def test_batch(self):
+        self._run(
+            [
+                "# provisioning",
+                f"set {UUIDS[0]} --name node-0",
+                "",
+                json.dumps(["sync", UUIDS[1]]),
+                f"openstack hardware availability add {UUIDS[2]} "
+                "--start 2021-08-01T00:00Z --end 2021-08-02T00:00Z",
+            ]
+        )
+
+        self.assertEqual(
+            [
+                ["2", "ok", "set", ""],
+                ["4", "ok", "sync", ""],
+                ["5", "ok", "availability add", ""],
+            ],
+            self._report(),
+        )
+        self.hardware_mock.update.assert_any_call(
+            UUIDS[0], [{"op": "add", "path": "/name", "value": "node-0"}]
+        )
+        self.hardware_mock.sync.assert_called_once_with(UUIDS[1])
+        self.assertEqual(2, self.hardware_mock.update.call_count)
+
+    def test_batch_failures(self):
+        self.hardware_mock.sync.side_effect = Exception("boom")
+
+        self.assertRaises(
+            exceptions.CommandError,
+            self._run,
+            [f"sync {UUIDS[0]}", f"delete {UUIDS[1]}", f"set {UUIDS[2]} --bogus"],
+        )
+
+        report = self._report()
+        self.assertEqual(["1", "failed", "sync", "boom"], report[0])
+        self.assertEqual(["2", "failed"], report[1][:2])
+        self.assertIn("unsupported command", report[1][3])
+        self.assertEqual(["3", "failed", "set", "invalid arguments"], report[2])
+
+    def test_batch_dry_run(self):
+        self._run([f"sync {UUIDS[0]}", f"set {UUIDS[1]} --name x"], "--dry-run")
+
+        self.hardware_mock.sync.assert_not_called()
+        self.hardware_mock.update.assert_not_called()
+
+    def test_batch_concurrency_keeps_order_per_hardware(self):
+        order = []
+        first_started = threading.Event()
+
+        def sync(uuid):
+            if uuid == UUIDS[0] and not first_started.is_set():
+                first_started.set()
+                # Give a misordered second line for this item time to run.
+                threading.Event().wait(0.05)
+            order.append(uuid)
+
+        self.hardware_mock.sync.side_effect = sync
+
+        self._run(
+            [f"sync {UUIDS[0]}", f"sync {UUIDS[1]}", f"sync {UUIDS[0]}"],
+            "--concurrency",
+            "3",
+        )
+
+        self.assertEqual(UUIDS[1], order[0])
+        self.assertEqual([UUIDS[0], UUIDS[0]], order[1:])
+
+    def test_batch_names_are_resolved_before_running(self):
+        names = {"node-0": UUIDS[0], "node-1": UUIDS[1]}
+
+        def find_uuid(arg):
+            if arg in names.values():
+                return arg
+            try:
+                return names[arg]
+            except KeyError:
+                raise LookupError(f"No hardware exists with the name '{arg}'.")
+
+        order = []
+        self.hardware_mock.find_uuid.side_effect = find_uuid
+        self.hardware_mock.update.side_effect = lambda uuid, patch: (
+            threading.Event().wait(0.05),
+            order.append(("update", uuid)),
+        )
+        self.hardware_mock.get_availability.side_effect = lambda uuid: (
+            order.append(("get_availability", uuid)) or []
+        )
+
+        self.assertRaises(
+            exceptions.CommandError,
+            self._run,
+            [
+                "set node-0 --name node-00",
+                "availability add node-0 "
+                "--start 2021-08-01T00:00Z --end 2021-08-02T00:00Z",
+                # Names refer to the hardware as it was before the batch.
+                "sync node-00",
+            ],
+            "--concurrency",
+            "3",
+        )
+
+        self.assertEqual(("update", UUIDS[0]), order[0])
+        self.assertEqual(("get_availability", UUIDS[0]), order[1])
+        report = self._report()
+        self.assertEqual(["1", "ok"], report[0][:2])
+        self.assertEqual(["2", "ok"], report[1][:2])
+        self.assertEqual(["3", "failed", "sync"], report[2][:3])
+        self.assertIn("node-00", report[2][3])
+
+    def test_batch_filter_selection_waits_for_earlier_lines(self):
+        order = []
+        self.hardware_mock.sync.side_effect = lambda uuid: order.append(uuid)
+        self.hardware_mock.update.side_effect = lambda uuid, patch: (
+            threading.Event().wait(0.05),
+            order.append("update"),
+        )
+        self.hardware_mock.export.return_value = [
+            hardware_fakes.FakeHardware.create_one_hardware({"uuid": UUIDS[2]})
+        ]
+
+        self._run(
+            [f"set {UUIDS[0]} --name x", "sync --all", f"sync {UUIDS[1]}"],
+            "--concurrency",
+            "3",
+        )
+
+        self.assertEqual(["update", UUIDS[2], UUIDS[1]], order)
+
+    def test_batch_bulk_command_item_failures(self):
+        self.hardware_mock.sync.side_effect = [None, Exception("boom")]
+
+        self.assertRaises(
+            exceptions.CommandError, self._run, [f"sync {UUIDS[0]} {UUIDS[1]}"]
+        )
+
+        self.assertEqual(
+            ["1", "failed", "sync", "1 of 2 hardware items failed."], self._report()[0]
+        )
@@ -0,0 +1,41 @@
+import unittest
+
+import yaml
+
+from doniclient.osc import common
+
+
+class TestNestedColumns(unittest.TestCase):
+    value = {
+        "interfaces": [{"name": "eno1", "mac_address": "aa:bb:cc:dd:ee:ff"}],
+        "cpu_arch": "x86_64",
+    }
+
+    def test_yaml_column_matches_yaml_dump(self):
+        self.assertEqual(
+            yaml.dump(self.value), common.YamlColumn(self.value).human_readable()
+        )
+
+    def test_yaml_column_is_memoized(self):
+        common._render_yaml.cache_clear()
+
+        for _ in range(3):
+            common.YamlColumn(dict(self.value)).human_readable()
+
+        info = common._render_yaml.cache_info()
+        self.assertEqual((2, 1), (info.hits, info.misses))
+
+    def test_json_column(self):
+        self.assertEqual(
+            '{"cpu_arch":"x86_64","interfaces":'
+            '[{"mac_address":"aa:bb:cc:dd:ee:ff","name":"eno1"}]}',
+            common.JsonColumn(self.value).human_readable(),
+        )
+        self.assertEqual(self.value, common.JsonColumn(self.value).machine_readable())
+
+    def test_hardware_formatters(self):
+        self.assertEqual({}, common.hardware_formatters(None))
+        self.assertEqual(
+            {"properties": common.JsonColumn, "workers": common.JsonColumn},
+            common.hardware_formatters("json"),
+        )
@@ -1,3 +1,12 @@
+import gzip
+import json
+import os
+import tempfile
+import types
+from unittest import mock
+
+from keystoneauth1.exceptions import Conflict, Forbidden
+
 from doniclient.osc import cli as hardware_cli
 from doniclient.tests.osc import fakes as hardware_fakes
 from osc_lib import utils as oscutils
@@ -126,7 +135,7 @@ class TestHardwareList(TestHardware):
                 worker_type="ironic", worker_state="PENDING"
             )
         )
-        self.hardware_mock.list.return_value = list([hw1, hw2])
+        self.hardware_mock.iter_list.return_value = list([hw1, hw2])
         self.cmd = hardware_cli.ListHardware(self.app, None)
 
     def test_hardware_list(self):
@@ -138,8 +147,19 @@ class TestHardwareList(TestHardware):
         columns, data = self.cmd.take_action(parsed_args)
         self.assertEqual(len(data), 2)
 
-        expected_args = []
-        self.hardware_mock.list.assert_called_with(*expected_args)
+        self.hardware_mock.iter_list.assert_called_with(page_size=None)
+
+    def test_hardware_list_page_size(self):
+        arglist = ["--all", "--page-size", "100"]
+        verifylist = [("all", True), ("page_size", 100)]
+        parsed_args = self.check_parser(self.cmd, arglist, verifylist)
+        self.hardware_mock.iter_export.return_value = iter([])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.assertEqual(0, len(data))
+        self.hardware_mock.iter_export.assert_called_with(page_size=100)
+        self.hardware_mock.export.assert_not_called()
 
     def test_hardware_list_worker_state_filter(self):
         arglist = ["--worker-state", "PENDING"]
@@ -150,8 +170,9 @@ class TestHardwareList(TestHardware):
         columns, data = self.cmd.take_action(parsed_args)
         self.assertEqual(len(data), 2)
 
-        expected_args = []
-        self.hardware_mock.list.assert_called_with(*expected_args)
+        self.hardware_mock.iter_list.assert_called_with(
+            page_size=None, worker_state="PENDING"
+        )
 
     def test_hardware_list_worker_type_filter(self):
         # Test with worker type filter
@@ -162,8 +183,9 @@ class TestHardwareList(TestHardware):
         columns, data = self.cmd.take_action(parsed_args)
         self.assertEqual(len(data), 2)
 
-        expected_args = []
-        self.hardware_mock.list.assert_called_with(*expected_args)
+        self.hardware_mock.iter_list.assert_called_with(
+            page_size=None, worker_type="ironic"
+        )
 
     def test_hardware_list_combined_filters(self):
         # Test with both worker type and state filters
@@ -174,8 +196,9 @@ class TestHardwareList(TestHardware):
         columns, data = self.cmd.take_action(parsed_args)
         self.assertEqual(len(data), 0)
 
-        expected_args = []
-        self.hardware_mock.list.assert_called_with(*expected_args)
+        self.hardware_mock.iter_list.assert_called_with(
+            page_size=None, worker_type="blazar", worker_state="STEADY"
+        )
 
         arglist = ["--worker-type", "blazar", "--worker-state", "PENDING"]
         verifylist = [("worker_type", "blazar"), ("worker_state", "PENDING")]
@@ -184,8 +207,118 @@ class TestHardwareList(TestHardware):
         columns, data = self.cmd.take_action(parsed_args)
         self.assertEqual(len(data), 1)
 
-        expected_args = []
-        self.hardware_mock.list.assert_called_with(*expected_args)
+        self.hardware_mock.iter_list.assert_called_with(
+            page_size=None, worker_type="blazar", worker_state="PENDING"
+        )
+
+    def test_hardware_list_worker_columns_are_aligned(self):
+        parsed_args = self.check_parser(self.cmd, [], [])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.assertEqual(
+            ["blazar", "blazar last error", "ironic", "ironic last error"],
+            columns[-4:],
+        )
+        self.assertEqual(("PENDING", "-", "STEADY", "-"), data[0][-4:])
+        self.assertEqual(("-", "-", "PENDING", "-"), data[1][-4:])
+
+    def test_hardware_list_declared_worker_columns(self):
+        arglist = ["--worker-columns", "ironic,other", "--worker-state", "PENDING"]
+        verifylist = [("worker_columns", ["ironic", "other"])]
+        parsed_args = self.check_parser(self.cmd, arglist, verifylist)
+        self.hardware_mock.iter_list.return_value = iter(
+            self.hardware_mock.iter_list.return_value
+        )
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.assertIsInstance(data, types.GeneratorType)
+        self.assertEqual(
+            ["ironic", "ironic last error", "other", "other last error"],
+            columns[-4:],
+        )
+        rows = list(data)
+        self.assertEqual(2, len(rows))
+        self.assertEqual(("STEADY", "-", "-", "-"), rows[0][-4:])
+        self.assertEqual(("PENDING", "-", "-", "-"), rows[1][-4:])
+
+    def test_hardware_list_nested_format_json(self):
+        arglist = ["--long", "--nested-format", "json"]
+        verifylist = [("nested_format", "json")]
+        parsed_args = self.check_parser(self.cmd, arglist, verifylist)
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        properties = data[0][columns.index("Properties")]
+        self.assertEqual("{}", properties.human_readable())
+
+    def test_hardware_list_group_by_worker_state(self):
+        arglist = ["--group-by", "worker-state"]
+        verifylist = [("group_by", "worker-state")]
+        parsed_args = self.check_parser(self.cmd, arglist, verifylist)
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.assertEqual(("worker_type", "state", "count"), columns)
+        self.assertEqual(
+            [
+                ("blazar", "PENDING", 1),
+                ("ironic", "STEADY", 1),
+                ("ironic", "PENDING", 1),
+            ],
+            data,
+        )
+
+    def test_hardware_list_other_filters(self):
+        arglist = [
+            "--all",
+            "--hardware-type",
+            "baremetal",
+            "--name-prefix",
+            "c01-",
+            "--project-id",
+            "p1",
+        ]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+        self.hardware_mock.iter_export.return_value = iter([])
+
+        self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.iter_export.assert_called_with(
+            page_size=None,
+            hardware_type="baremetal",
+            name_prefix="c01-",
+            project_id="p1",
+        )
+
+
+class TestWorkerIndex(unittest.TestCase):
+    def test_select(self):
+        def hardware(*workers):
+            return {
+                "workers": [
+                    hardware_fakes.FakeHardware.create_one_worker(t, s)
+                    for t, s in workers
+                ]
+            }
+
+        index = hardware_cli.WorkerIndex(
+            [
+                hardware(("blazar", "ERROR"), ("ironic", "ERROR")),
+                hardware(("ironic", "STEADY")),
+                hardware(("blazar", "STEADY")),
+                hardware(),
+            ]
+        )
+
+        self.assertEqual([0, 1, 2, 3], list(index.select()))
+        self.assertEqual([0, 2], index.select(worker_type="blazar"))
+        self.assertEqual([0], index.select(worker_state="ERROR"))
+        self.assertEqual([1, 2], index.select(worker_state="STEADY"))
+        self.assertEqual([1], index.select("ironic", "STEADY"))
+        self.assertEqual([], index.select("tunelo", "STEADY"))
+        self.assertEqual(["ironic", "blazar"], index.worker_types([1, 2]))
 
 
 class TestHardwareCreate(TestHardware):
@@ -243,6 +376,55 @@ class TestHardwareDelete(TestHardware):
         self.cmd.take_action(parsed_args)
         self.hardware_mock.delete.assert_called_with(FAKE_HARDWARE_UUID)
 
+    def test_hardware_delete_name_pattern(self):
+        self.hardware_mock.list.return_value = [
+            hardware_fakes.FakeHardware.create_one_hardware(
+                {"uuid": f"uuid-{name}", "name": name}
+            )
+            for name in ("c01-n1", "c01-n2", "c02-n1")
+        ]
+        self.hardware_mock.delete.side_effect = [None, Exception("boom")]
+        arglist = ["--name-pattern", "c01-*", "--concurrency", "1", "--yes"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.list.assert_called_once_with()
+        self.assertEqual(
+            [("uuid-c01-n1", "c01-n1", "deleted"), ("uuid-c01-n2", "c01-n2", "boom")],
+            data,
+        )
+        self.assertRaisesRegex(
+            exceptions.CommandError,
+            "1 of 2 hardware items failed",
+            self.cmd.check_results,
+        )
+
+    def test_hardware_delete_selection_requires_confirmation(self):
+        for arglist in (["--all"], ["--name-pattern", "*"]):
+            parsed_args = self.check_parser(self.cmd, arglist, [("yes", False)])
+
+            self.assertRaises(
+                exceptions.CommandError, self.cmd.take_action, parsed_args
+            )
+
+        self.hardware_mock.list.assert_not_called()
+        self.hardware_mock.export.assert_not_called()
+        self.hardware_mock.delete.assert_not_called()
+
+    def test_hardware_delete_dry_run(self):
+        arglist = [FAKE_HARDWARE_UUID, FAKE_HARDWARE_NAME, "--dry-run"]
+        self.hardware_mock.list.return_value = [
+            hardware_fakes.FakeHardware.create_one_hardware()
+        ]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.delete.assert_not_called()
+        self.assertEqual(["dry-run", "dry-run"], [row[2] for row in data])
+        self.cmd.check_results()
+
 
 class TestHardwareSetMeta(type):
     """Metaclass to generate list of test cases."""
@@ -251,19 +433,14 @@ class TestHardwareSetMeta(type):
         def gen_test(hw_type, arg, prop, path, value, use_name=False):
             def test(self):
                 name_or_id = FAKE_HARDWARE_UUID
-                self.hardware_mock.get.return_value = (
-                    hardware_fakes.FakeHardware.create_one_hardware()
-                )
                 self.hardware_mock.update.return_value = (
                     hardware_fakes.FakeHardware.create_one_hardware()
                 )
                 if use_name:
                     name_or_id = FAKE_HARDWARE_NAME
-                    self.hardware_mock.get.side_effect = Exception
-                    self.hardware_mock.find.side_effect = Exception
-                    self.hardware_mock.list.return_value = [
-                        hardware_fakes.FakeHardware.create_one_hardware()
-                    ]
+                    self.hardware_mock.find_uuid.side_effect = {
+                        FAKE_HARDWARE_NAME: FAKE_HARDWARE_UUID
+                    }.get
                 arglist = [
                     name_or_id,
                     "--hardware_type",
@@ -275,8 +452,9 @@ class TestHardwareSetMeta(type):
                 assert parsed_args.properties == {prop: value}
 
                 self.cmd.take_action(parsed_args)
-                # test if the get is called with name
-                self.hardware_mock.get.assert_called_with(name_or_id)
+                # The UUID is resolved without fetching the hardware
+                self.hardware_mock.find_uuid.assert_called_once_with(name_or_id)
+                self.hardware_mock.get.assert_not_called()
                 if 'Unset' in name:
                     self.hardware_mock.update.assert_called_with(
                     FAKE_HARDWARE_UUID, [{"op": "remove", "path": path, "value": value}]
@@ -301,6 +479,15 @@ class TestHardwareSet(TestHardware, metaclass=TestHardwareSetMeta):
         super().setUp()
         self.cmd = hardware_cli.UpdateHardware(self.app, None)
 
+    def test_unknown_name(self):
+        self.hardware_mock.find_uuid.side_effect = LookupError("no such hardware")
+        arglist = [FAKE_HARDWARE_NAME, "--name", "new-name"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.assertRaises(exceptions.CommandError, self.cmd.take_action, parsed_args)
+        self.hardware_mock.list.assert_not_called()
+        self.hardware_mock.update.assert_not_called()
+
 
 class TestHardwareUnset(TestHardware, metaclass=TestHardwareSetMeta):
     def setUp(self):
@@ -335,3 +522,316 @@ class TestHardwareSync(TestHardware):
         ]
         self.cmd.take_action(parsed_args)
         self.hardware_mock.sync.assert_called_with(FAKE_HARDWARE_UUID)
+
+    def test_hardware_sync_many(self):
+        hw = [
+            hardware_fakes.FakeHardware.create_one_hardware(
+                {"uuid": f"uuid-{i}", "name": f"node-{i}"}
+            )
+            for i in range(3)
+        ]
+        self.hardware_mock.list.return_value = hw
+        arglist = [FAKE_HARDWARE_UUID, "node-1", "node-2", "missing"]
+        arglist += ["--concurrency", "2"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.list.assert_called_once_with()
+        self.hardware_mock.get.assert_not_called()
+        self.assertEqual(
+            sorted([FAKE_HARDWARE_UUID, "uuid-1", "uuid-2"]),
+            sorted(c.args[0] for c in self.hardware_mock.sync.call_args_list),
+        )
+        self.assertEqual(
+            [
+                (FAKE_HARDWARE_UUID, None, "synced"),
+                ("uuid-1", "node-1", "synced"),
+                ("uuid-2", "node-2", "synced"),
+                (None, "missing", "Could not find resource missing"),
+            ],
+            data,
+        )
+        self.assertRaises(exceptions.CommandError, self.cmd.check_results)
+
+    def test_hardware_sync_failures_fail_command(self):
+        self.hardware_mock.list.return_value = []
+        arglist = ["missing", "other", "-f", "value"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.assertRaisesRegex(
+            exceptions.CommandError,
+            "2 of 2 hardware items failed",
+            self.cmd.run,
+            parsed_args,
+        )
+        # The table is still printed first.
+        self.assertEqual(2, len(self.app.stdout.content))
+
+    def test_hardware_sync_worker_filter(self):
+        hw1 = hardware_fakes.FakeHardware.create_one_hardware({"uuid": "uuid-1"})
+        hw1["workers"] = [
+            hardware_fakes.FakeHardware.create_one_worker("ironic", "ERROR")
+        ]
+        hw2 = hardware_fakes.FakeHardware.create_one_hardware({"uuid": "uuid-2"})
+        hw2["workers"] = [
+            hardware_fakes.FakeHardware.create_one_worker("ironic", "STEADY")
+        ]
+        self.hardware_mock.export.return_value = [hw1, hw2]
+        arglist = ["--all", "--worker-type", "ironic", "--worker-state", "ERROR"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        columns, data = self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.sync.assert_called_once_with("uuid-1")
+        self.assertEqual(1, len(data))
+
+    def test_hardware_sync_requires_targets(self):
+        parsed_args = self.check_parser(self.cmd, [], [])
+        self.assertRaises(exceptions.CommandError, self.cmd.take_action, parsed_args)
+
+
+class TestHardwareImport(TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.cmd = hardware_cli.ImportHardware(self.app, None)
+        self.items = [
+            {"name": f"node-{i}", "hardware_type": "baremetal"} for i in range(5)
+        ]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.input_file = self._write_input(json.dumps(self.items))
+        self.summary_file = os.path.join(self.tmpdir.name, "summary.json")
+
+        def create(item):
+            if item["name"] == "node-2":
+                raise Conflict(response=mock.Mock(text="exists"))
+            return dict(item, uuid=f"uuid-{item['name']}")
+
+        self.hardware_mock.create.side_effect = create
+
+    def _write_input(self, content, name="hardware.json"):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_hardware_import_concurrent_skip_existing(self):
+        arglist = [
+            "--file", self.input_file,
+            "--skip_existing",
+            "--concurrency", "3",
+            "--summary", self.summary_file,
+        ]
+        parsed_args = self.check_parser(self.cmd, arglist, [("concurrency", 3)])
+
+        self.cmd.take_action(parsed_args)
+
+        self.assertEqual(5, self.hardware_mock.create.call_count)
+        lines = "".join(self.app.stdout.content).splitlines()
+        self.assertEqual(
+            ["created", "created", "skipped", "created", "created"],
+            [line.split("\t")[1] for line in lines],
+        )
+        with open(self.summary_file) as f:
+            summary = json.load(f)
+        self.assertEqual(4, len(summary["created"]))
+        self.assertEqual(
+            [{"index": 2, "name": "node-2", "uuid": None}], summary["skipped"]
+        )
+        self.assertEqual([], summary["failed"])
+
+    def test_hardware_import_conflict_aborts(self):
+        arglist = ["--file", self.input_file, "--summary", self.summary_file]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.assertRaises(Conflict, self.cmd.take_action, parsed_args)
+
+        with open(self.summary_file) as f:
+            summary = json.load(f)
+        self.assertEqual(["node-0", "node-1"], [i["name"] for i in summary["created"]])
+        self.assertEqual("node-2", summary["failed"][0]["name"])
+        self.assertEqual(3, self.hardware_mock.create.call_count)
+
+    def test_hardware_import_ndjson(self):
+        ndjson = "\n".join(json.dumps(item) for item in self.items)
+        arglist = ["--file", self._write_input(ndjson, "hardware.ndjson")]
+        arglist += ["--skip_existing"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.create.assert_any_call(self.items[4])
+        self.assertEqual(5, self.hardware_mock.create.call_count)
+
+    def test_hardware_import_gzip(self):
+        path = os.path.join(self.tmpdir.name, "hardware.ndjson.gz")
+        with gzip.open(path, "wt") as f:
+            f.write("\n".join(json.dumps(item) for item in self.items))
+        arglist = ["--file", path, "--skip_existing"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.create.assert_any_call(self.items[4])
+        self.assertEqual(5, self.hardware_mock.create.call_count)
+
+    def test_hardware_import_resume_from_journal(self):
+        journal_file = os.path.join(self.tmpdir.name, "import.journal")
+        arglist = ["--file", self.input_file, "--journal", journal_file]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+        self.assertRaises(Conflict, self.cmd.take_action, parsed_args)
+        self.assertEqual(3, self.hardware_mock.create.call_count)
+
+        self.hardware_mock.reset_mock()
+        self.hardware_mock.create.side_effect = lambda item: dict(item, uuid="x")
+        parsed_args = self.check_parser(self.cmd, arglist + ["--resume"], [])
+        self.cmd.take_action(parsed_args)
+
+        self.assertEqual(
+            [mock.call(item) for item in self.items[2:]],
+            self.hardware_mock.create.call_args_list,
+        )
+        with open(journal_file) as f:
+            journaled = [json.loads(line)["index"] for line in f]
+        self.assertEqual([0, 1, 2, 3, 4], journaled)
+
+    def test_hardware_import_resume_requires_journal(self):
+        arglist = ["--file", self.input_file, "--resume"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+        self.assertRaises(exceptions.CommandError, self.cmd.take_action, parsed_args)
+
+    def test_hardware_import_reconcile(self):
+        live = [
+            dict(item, uuid=f"uuid-{i}", properties={"cpu_arch": "x86_64"})
+            for i, item in enumerate(self.items[:3])
+        ]
+        self.hardware_mock.export.return_value = live
+        self.hardware_mock.update.side_effect = lambda uuid, patch: {"uuid": uuid}
+        items = [dict(item, properties={"cpu_arch": "x86_64"}) for item in self.items]
+        items[1]["properties"] = {"cpu_arch": "aarch64", "node_type": "gpu"}
+        arglist = ["--file", self._write_input(json.dumps(items)), "--reconcile"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        # Hardware of other projects is included, so it is not created again.
+        self.hardware_mock.export.assert_called_once_with()
+        self.hardware_mock.list.assert_not_called()
+        self.hardware_mock.update.assert_called_once_with(
+            "uuid-1",
+            [
+                {"op": "add", "path": "/properties/cpu_arch", "value": "aarch64"},
+                {"op": "add", "path": "/properties/node_type", "value": "gpu"},
+            ],
+        )
+        self.assertEqual(
+            [mock.call(items[3]), mock.call(items[4])],
+            self.hardware_mock.create.call_args_list,
+        )
+        lines = "".join(self.app.stdout.content).splitlines()
+        self.assertEqual(
+            ["unchanged", "updated", "unchanged", "created", "created"],
+            [line.split("\t")[1] for line in lines],
+        )
+
+    def test_hardware_import_reconcile_dry_run(self):
+        self.hardware_mock.export.side_effect = Forbidden()
+        self.hardware_mock.list.return_value = [
+            dict(self.items[0], uuid="uuid-0", properties={"cpu_arch": "x86_64"}),
+            dict(self.items[1], uuid="uuid-1", properties={}),
+        ]
+        items = [dict(item, properties={"cpu_arch": "x86_64"}) for item in self.items]
+        arglist = ["--file", self._write_input(json.dumps(items[:3]))]
+        arglist += ["--reconcile", "--dry-run"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        # Without admin rights only the project's own hardware is compared.
+        self.hardware_mock.list.assert_called_once_with()
+        self.hardware_mock.update.assert_not_called()
+        self.hardware_mock.create.assert_not_called()
+        patch = [{"op": "add", "path": "/properties/cpu_arch", "value": "x86_64"}]
+        lines = "".join(self.app.stdout.content).splitlines()
+        self.assertEqual(
+            [
+                ["0", "unchanged", "node-0", "uuid-0"],
+                ["1", "update", "node-1", json.dumps(patch)],
+                ["2", "create", "node-2", json.dumps(items[2])],
+            ],
+            [line.split("\t") for line in lines],
+        )
+
+
+class TestHardwareExport(TestHardware):
+    def setUp(self):
+        super().setUp()
+        self.cmd = hardware_cli.ExportHardware(self.app, None)
+        self.import_cmd = hardware_cli.ImportHardware(self.app, None)
+        self.items = [
+            {
+                "uuid": f"uuid-{i}",
+                "name": f"node-{i}",
+                "hardware_type": "baremetal",
+                "properties": {"management_address": f"10.0.0.{i}", "cpus": 8},
+                "workers": [],
+            }
+            for i in range(3)
+        ]
+        self.hardware_mock.iter_export.return_value = iter(self.items)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_hardware_export_gzip_all_fields(self):
+        path = os.path.join(self.tmpdir.name, "hardware.ndjson.gz")
+        arglist = ["--output", path, "--page-size", "100", "--all-fields"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        self.hardware_mock.iter_export.assert_called_with(page_size=100)
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(self.items, [json.loads(line) for line in f])
+
+    def test_hardware_export_fields(self):
+        path = os.path.join(self.tmpdir.name, "hardware.ndjson")
+        arglist = ["-o", path, "--fields", "name,properties.management_address"]
+        parsed_args = self.check_parser(self.cmd, arglist, [])
+
+        self.cmd.take_action(parsed_args)
+
+        with open(path) as f:
+            exported = [json.loads(line) for line in f]
+        self.assertEqual(
+            {"name": "node-0", "properties": {"management_address": "10.0.0.0"}},
+            exported[0],
+        )
+
+    def test_hardware_export_round_trip(self):
+        path = os.path.join(self.tmpdir.name, "hardware.ndjson.gz")
+        self.cmd.take_action(self.check_parser(self.cmd, ["-o", path], []))
+
+        parsed_args = self.check_parser(self.import_cmd, ["--file", path], [])
+        self.import_cmd.take_action(parsed_args)
+
+        expected = [
+            mock.call({k: item[k] for k in ("name", "hardware_type", "properties")})
+            for item in self.items
+        ]
+        self.assertEqual(expected, self.hardware_mock.create.call_args_list)
+
+
+class TestReconcilePatch(unittest.TestCase):
+    def test_unchanged(self):
+        hw = {"name": "a", "properties": {"x": 1, "y": {"z": [1, 2]}}}
+        self.assertEqual([], hardware_cli.get_reconcile_patch(hw, dict(hw)))
+
+    def test_prune(self):
+        live = {"properties": {"x": 1, "y": 2}}
+        desired = {"properties": {"x": 1}}
+        self.assertEqual([], hardware_cli.get_reconcile_patch(live, desired))
+        self.assertEqual(
+            [{"op": "remove", "path": "/properties/y"}],
+            hardware_cli.get_reconcile_patch(live, desired, prune=True),
+        )
@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+import unittest
+
+# The plugin module is imported by every openstack command, so its import
+# cost (on top of osc_lib, which the openstack client loads anyway) must stay
+# small. The budget is generous to avoid flakiness on slow machines.
+IMPORT_BUDGET_US = 30000
+
+# Dependencies that must only be imported once an inventory command runs.
+DEFERRED_MODULES = [
+    "aiohttp",
+    "dateutil",
+    "keystoneauth1",
+    "requests",
+    "yaml",
+    "doniclient.osc.cli",
+    "doniclient.v1.client",
+]
+
+
+def _run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+class TestPluginImport(unittest.TestCase):
+    def test_plugin_imports_no_heavy_modules(self):
+        result = _run_python(
+            "-c",
+            "import json, sys\n"
+            "import osc_lib.utils\n"
+            "before = set(sys.modules)\n"
+            "import doniclient.osc.plugin\n"
+            "print(json.dumps(sorted(set(sys.modules) - before)))",
+        )
+        imported = json.loads(result.stdout)
+
+        for module in DEFERRED_MODULES:
+            self.assertFalse(
+                [m for m in imported if m == module or m.startswith(module + ".")],
+                f"{module} is imported with the plugin",
+            )
+
+    def test_plugin_import_time(self):
+        result = _run_python(
+            "-X", "importtime", "-c", "import osc_lib.utils, doniclient.osc.plugin"
+        )
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            _, _, timings = line.partition("import time:")
+            fields = [field.strip() for field in timings.split("|")]
+            if len(fields) == 3 and fields[1].isdigit():
+                cumulative[fields[2]] = int(fields[1])
+
+        self.assertLess(cumulative["doniclient.osc.plugin"], IMPORT_BUDGET_US)
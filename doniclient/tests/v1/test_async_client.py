@@ -0,0 +1,136 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from keystoneauth1.exceptions import Conflict
+
+from doniclient.v1.async_client import AsyncClient
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+
+class FakeDoni(object):
+    """A tiny in-memory Doni API served over real HTTP."""
+
+    def __init__(self):
+        self.hardware = {
+            f"00000000-0000-0000-0000-{n:012d}": {
+                "uuid": f"00000000-0000-0000-0000-{n:012d}",
+                "name": f"node-{n}",
+            }
+            for n in range(20)
+        }
+        self.synced = []
+        self.tokens = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def app(self):
+        @web.middleware
+        async def track(request, handler):
+            return await self.track(request, handler)
+
+        app = web.Application(middlewares=[track])
+        app.router.add_get("/v1/hardware/", self.list)
+        app.router.add_get("/v1/hardware/{uuid}/", self.get)
+        app.router.add_post("/v1/hardware/", self.create)
+        app.router.add_post("/v1/hardware/{uuid}/sync", self.sync)
+        return app
+
+    async def track(self, request, handler):
+        self.tokens.append(request.headers.get("X-Auth-Token"))
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    async def list(self, request):
+        return web.json_response({"hardware": list(self.hardware.values())})
+
+    async def get(self, request):
+        hardware = self.hardware.get(request.match_info["uuid"])
+        if hardware is None:
+            raise web.HTTPNotFound()
+        return web.json_response(hardware)
+
+    async def create(self, request):
+        body = await request.json()
+        if any(hw["name"] == body["name"] for hw in self.hardware.values()):
+            return web.json_response({"error": {"message": "exists"}}, status=409)
+        return web.json_response(dict(body, uuid="new"), status=201)
+
+    async def sync(self, request):
+        self.synced.append(request.match_info["uuid"])
+        return web.Response(status=202)
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.doni = FakeDoni()
+        self.server = TestServer(self.doni.app())
+        await self.server.start_server()
+        self.adapter = mock.Mock()
+        self.adapter.get_token.return_value = "TOKEN"
+        self.adapter.get_endpoint.return_value = str(self.server.make_url("/"))
+        self.adapter.session.verify = True
+        self.adapter.session.cert = None
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_list_and_get(self):
+        async with AsyncClient(self.adapter) as client:
+            hardware = await client.list()
+            by_uuid = await client.get(hardware[3]["uuid"])
+            by_name = await client.get("node-4")
+
+        self.assertEqual(20, len(hardware))
+        self.assertEqual("node-3", by_uuid["name"])
+        self.assertEqual("node-4", by_name["name"])
+        self.assertEqual({"TOKEN"}, set(self.doni.tokens))
+
+    async def test_gather_respects_concurrency_limit(self):
+        uuids = list(self.doni.hardware)
+        async with AsyncClient(self.adapter, max_concurrency=5) as client:
+            await asyncio.gather(*(client.sync(uuid) for uuid in uuids))
+
+        self.assertEqual(sorted(uuids), sorted(self.doni.synced))
+        self.assertLessEqual(self.doni.peak_in_flight, 5)
+        self.assertGreater(self.doni.peak_in_flight, 1)
+
+    async def test_errors_are_keystoneauth_exceptions(self):
+        async with AsyncClient(self.adapter) as client:
+            created = await client.create({"name": "node-new"})
+            with self.assertRaises(Conflict):
+                await client.create({"name": "node-1"})
+
+        self.assertEqual("new", created["uuid"])
+
+    async def test_token_refresh_does_not_block_event_loop(self):
+        ticks = []
+
+        def get_token():
+            # A slow token refresh, as when keystoneauth re-authenticates.
+            time.sleep(0.1)
+            return "TOKEN"
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        self.adapter.get_token.side_effect = get_token
+        async with AsyncClient(self.adapter) as client:
+            await asyncio.gather(tick(), client.list())
+
+        self.assertEqual(5, len(ticks))
+        self.assertLess(ticks[-1] - ticks[0], 0.09)
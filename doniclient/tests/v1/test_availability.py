@@ -0,0 +1,122 @@
+import random
+import unittest
+
+from doniclient.v1.availability import (
+    AVAILABLE,
+    PARTIAL,
+    UNAVAILABLE,
+    AvailabilityIndex,
+    WindowList,
+    to_datetime,
+    validate_window,
+)
+
+
+def _window(n, start_day, end_day):
+    return {
+        "uuid": f"window-{n}",
+        "start": f"2021-08-{start_day:02d}T00:00:00Z",
+        "end": f"2021-08-{end_day:02d}T00:00:00Z",
+    }
+
+
+def _day(day):
+    return to_datetime(f"2021-08-{day:02d}T00:00:00")
+
+
+class TestWindowList(unittest.TestCase):
+    def setUp(self):
+        self.windows = WindowList(
+            [_window(2, 10, 12), _window(0, 1, 3), _window(1, 3, 5), _window(3, 20, 30)]
+        )
+
+    def test_sorted(self):
+        self.assertEqual(
+            ["window-0", "window-1", "window-2", "window-3"],
+            [w.uuid for w in self.windows],
+        )
+
+    def test_overlapping(self):
+        self.assertEqual(
+            ["window-1", "window-2"],
+            [w.uuid for w in self.windows.overlapping(_day(4), _day(11))],
+        )
+        # Windows touching the range at its boundaries do not overlap it.
+        self.assertEqual([], self.windows.overlapping(_day(5), _day(10)))
+        self.assertEqual(
+            ["window-3"],
+            [w.uuid for w in self.windows.overlapping(_day(21), _day(22))],
+        )
+
+    def test_status(self):
+        # Adjacent windows together cover the range.
+        self.assertEqual(AVAILABLE, self.windows.status(_day(2), _day(5)))
+        self.assertEqual(PARTIAL, self.windows.status(_day(4), _day(6)))
+        self.assertEqual(UNAVAILABLE, self.windows.status(_day(6), _day(9)))
+
+    def test_merged(self):
+        self.assertEqual(
+            [(_day(1), _day(5)), (_day(10), _day(12)), (_day(20), _day(30))],
+            [(w.start, w.end) for w in self.windows.merged()],
+        )
+
+    def test_gaps(self):
+        self.assertEqual(
+            [(_day(5), _day(10)), (_day(12), _day(15))],
+            [(w.start, w.end) for w in self.windows.gaps(_day(2), _day(15))],
+        )
+        self.assertEqual([], self.windows.gaps(_day(21), _day(22)))
+
+    def test_validate_window(self):
+        validate_window(self.windows, _day(5), _day(10))
+        self.assertRaisesRegex(
+            ValueError, "window-1", validate_window, self.windows, _day(4), _day(6)
+        )
+        # A window may be moved over its own previous position.
+        validate_window(self.windows, _day(9), _day(13), window_uuid="window-2")
+        self.assertRaises(ValueError, validate_window, self.windows, _day(7), _day(6))
+
+    def test_add_and_remove_match_rebuilt_list(self):
+        rng = random.Random(4)
+        windows = WindowList()
+        for n in range(200):
+            if len(windows) and rng.random() < 0.3:
+                windows.remove(rng.choice(list(windows)).uuid)
+            else:
+                start = rng.randrange(1, 28)
+                windows.add(_window(n, start, rng.randrange(start + 1, 30)))
+            rebuilt = WindowList(windows)
+            self.assertEqual(rebuilt._starts, windows._starts)
+            self.assertEqual(rebuilt._max_ends, windows._max_ends)
+            for day in range(1, 29):
+                self.assertEqual(
+                    rebuilt.overlapping(_day(day), _day(day + 1)),
+                    windows.overlapping(_day(day), _day(day + 1)),
+                )
+
+    def test_get_and_remove(self):
+        self.assertEqual(_day(10), self.windows.get("window-2").start)
+
+        self.windows.remove("window-2")
+
+        self.assertIsNone(self.windows.get("window-2"))
+        self.assertEqual([], self.windows.overlapping(_day(10), _day(12)))
+        self.assertRaises(KeyError, self.windows.remove, "window-2")
+
+
+class TestAvailabilityIndex(unittest.TestCase):
+    def test_query(self):
+        index = AvailabilityIndex(
+            {
+                "hw-0": [_window(0, 1, 10)],
+                "hw-1": [_window(1, 5, 10)],
+                "hw-2": [],
+            }
+        )
+
+        self.assertEqual(
+            [("hw-0", AVAILABLE), ("hw-1", PARTIAL), ("hw-2", UNAVAILABLE)],
+            list(index.query(_day(2), _day(8))),
+        )
+        self.assertEqual(["hw-0", "hw-1"], index.available(_day(6), _day(8)))
+        self.assertEqual(UNAVAILABLE, index.status("hw-9", _day(6), _day(8)))
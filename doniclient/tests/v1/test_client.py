@@ -0,0 +1,462 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+from keystoneauth1.exceptions import BadRequest, NotFound
+from keystoneauth1.session import TCPKeepAliveAdapter
+
+from doniclient.v1.cache import ResponseCache
+from doniclient.v1.client import Client
+from doniclient.v1.utils import bounded_map
+
+
+def _hardware(n):
+    return {"uuid": f"uuid-{n}", "name": f"node-{n}"}
+
+
+def _real_uuid(n):
+    return f"00000000-0000-0000-0000-{n:012d}"
+
+
+def _response(body, status_code=200, headers=None):
+    content = json.dumps(body).encode("utf-8")
+    resp = mock.Mock(encoding=None, status_code=status_code, headers=headers or {})
+    resp.json.return_value = body
+    resp.iter_content.side_effect = lambda chunk_size: (
+        content[i : i + 7] for i in range(0, len(content), 7)
+    )
+    return resp
+
+
+class TestClientPagination(unittest.TestCase):
+    def setUp(self):
+        self.adapter = mock.Mock()
+        self.client = Client(self.adapter)
+        self.inventory = [_hardware(n) for n in range(5)]
+
+    def _paginate(self, path, params=None, stream=False):
+        params = params or {}
+        start = 0
+        if "marker" in params:
+            uuids = [hw["uuid"] for hw in self.inventory]
+            start = uuids.index(params["marker"]) + 1
+        end = start + params["limit"] if "limit" in params else None
+        return _response({"hardware": self.inventory[start:end]})
+
+    def test_iter_list_follows_markers(self):
+        self.adapter.get.side_effect = self._paginate
+
+        result = list(self.client.iter_list(page_size=2))
+
+        self.assertEqual(self.inventory, result)
+        self.assertEqual(
+            [
+                mock.call("/v1/hardware/", params={"limit": 2}, stream=True),
+                mock.call(
+                    "/v1/hardware/",
+                    params={"limit": 2, "marker": "uuid-1"},
+                    stream=True,
+                ),
+                mock.call(
+                    "/v1/hardware/",
+                    params={"limit": 2, "marker": "uuid-3"},
+                    stream=True,
+                ),
+            ],
+            self.adapter.get.call_args_list,
+        )
+
+    def test_iter_list_is_lazy(self):
+        self.adapter.get.side_effect = self._paginate
+
+        iterator = self.client.iter_list(page_size=2)
+        self.assertEqual(_hardware(0), next(iterator))
+
+        self.adapter.get.assert_called_once_with(
+            "/v1/hardware/", params={"limit": 2}, stream=True
+        )
+
+    def test_iter_export_is_lazy(self):
+        self.adapter.get.side_effect = self._paginate
+
+        iterator = self.client.iter_export(page_size=2)
+        self.assertEqual(_hardware(0), next(iterator))
+
+        self.adapter.get.assert_called_once_with(
+            "/v1/hardware/export/", params={"limit": 2}, stream=True
+        )
+
+    def test_iter_list_without_server_pagination(self):
+        self.adapter.get.return_value = _response({"hardware": self.inventory[:4]})
+
+        result = list(self.client.iter_list(page_size=2))
+
+        self.assertEqual(self.inventory[:4], result)
+        self.adapter.get.assert_called_once()
+
+    def test_iter_list_ignored_marker(self):
+        self.adapter.get.return_value = _response({"hardware": self.inventory[:2]})
+
+        result = list(self.client.iter_list(page_size=2))
+
+        self.assertEqual(self.inventory[:2], result)
+        self.assertEqual(2, self.adapter.get.call_count)
+
+    def test_iter_list_without_streaming(self):
+        self.adapter.get.side_effect = self._paginate
+
+        result = list(self.client.iter_list(page_size=3, stream=False))
+
+        self.assertEqual(self.inventory, result)
+        self.adapter.get.assert_called_with(
+            "/v1/hardware/", params={"limit": 3, "marker": "uuid-2"}
+        )
+
+    def test_streamed_response_is_decoded_incrementally(self):
+        body = {"next": None, "hardware": self.inventory, "count": 5}
+        self.adapter.get.return_value = _response(body)
+
+        iterator = self.client.iter_list()
+        self.assertEqual(self.inventory[0], next(iterator))
+        self.assertEqual(self.inventory[1:], list(iterator))
+
+        self.adapter.get.return_value.json.assert_not_called()
+        self.adapter.get.return_value.close.assert_called_once_with()
+
+
+class TestClientCache(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.cache = ResponseCache(path=tmpdir.name, ttl=60)
+        self.adapter = mock.Mock()
+        self.adapter.get_endpoint.return_value = "https://doni.example.com"
+        self.adapter.get_project_id.return_value = "project"
+        self.client = Client(self.adapter, cache=self.cache)
+        self.inventory = [_hardware(n) for n in range(3)]
+        self.adapter.get.return_value = _response(
+            {"hardware": self.inventory}, headers={"ETag": '"v1"'}
+        )
+
+    def test_fresh_entry_is_used_without_request(self):
+        self.assertEqual(self.inventory, self.client.list())
+        self.assertEqual(self.inventory, self.client.list())
+        self.assertEqual(self.inventory, list(self.client.iter_list()))
+
+        self.adapter.get.assert_called_once_with("/v1/hardware/")
+
+    def test_stale_entry_is_revalidated(self):
+        self.client.list()
+        self.cache.ttl = 0
+        self.adapter.get.return_value = _response(None, status_code=304)
+
+        self.assertEqual(self.inventory, self.client.list())
+
+        self.adapter.get.assert_called_with(
+            "/v1/hardware/", headers={"If-None-Match": '"v1"'}
+        )
+
+    def test_refresh_ignores_ttl(self):
+        self.client.get_by_uuid("uuid-0")
+        self.cache.refresh = True
+
+        self.client.get_by_uuid("uuid-0")
+
+        self.assertEqual(2, self.adapter.get.call_count)
+
+    def test_writes_invalidate_cache(self):
+        self.client.list()
+        self.client.update("uuid-0", [])
+
+        self.client.list()
+
+        self.assertEqual(2, self.adapter.get.call_count)
+
+    def test_namespaces_are_separate(self):
+        self.client.list()
+        self.adapter.get_project_id.return_value = "other-project"
+        other_client = Client(self.adapter, cache=self.cache)
+
+        other_client.list()
+
+        self.assertEqual(2, self.adapter.get.call_count)
+
+
+class TestClientNameIndex(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.cache_dir = tmpdir.name
+        self.adapter = mock.Mock()
+        self.adapter.get_endpoint.return_value = "https://doni.example.com"
+        self.adapter.get_project_id.return_value = "project"
+        self.inventory = [
+            {"uuid": _real_uuid(n), "name": f"node-{n}"} for n in range(3)
+        ]
+        self.inventory.append({"uuid": _real_uuid(3), "name": "node-0"})
+        self.adapter.get.side_effect = self._get
+
+    def _get(self, path, **kwargs):
+        if path == "/v1/hardware/":
+            return _response({"hardware": self.inventory})
+        for hardware in self.inventory:
+            if path == f"/v1/hardware/{hardware['uuid']}/":
+                return _response(hardware)
+        raise NotFound()
+
+    def _client(self, cache=True):
+        cache = ResponseCache(path=self.cache_dir, ttl=0) if cache else None
+        return Client(self.adapter, cache=cache)
+
+    def test_uuid_skips_lookup(self):
+        client = self._client()
+
+        self.assertEqual(self.inventory[1], client.get(_real_uuid(1)))
+
+        self.adapter.get.assert_called_once_with(f"/v1/hardware/{_real_uuid(1)}/")
+
+    def test_name_is_resolved_from_one_listing(self):
+        client = self._client(cache=False)
+
+        for _ in range(3):
+            self.assertEqual(self.inventory[2], client.get("node-2"))
+
+        paths = [c.args[0] for c in self.adapter.get.call_args_list]
+        self.assertEqual(1, paths.count("/v1/hardware/"))
+        self.assertEqual(3, paths.count(f"/v1/hardware/{_real_uuid(2)}/"))
+
+    def test_index_is_persisted_between_clients(self):
+        self._client().list()
+        self.adapter.get.reset_mock()
+
+        self.assertEqual(self.inventory[1], self._client().get("node-1"))
+
+        self.adapter.get.assert_called_once_with(f"/v1/hardware/{_real_uuid(1)}/")
+
+    def test_stale_persisted_index_is_rebuilt(self):
+        self._client().list()
+        self.inventory[1] = {"uuid": _real_uuid(5), "name": "node-1"}
+        self.adapter.get.reset_mock()
+
+        self.assertEqual(self.inventory[1], self._client().get("node-1"))
+
+    def test_duplicate_and_unknown_names(self):
+        client = self._client()
+        self.assertRaises(LookupError, client.find_uuid, "node-0")
+        self.assertRaises(LookupError, client.find_uuid, "node-9")
+
+        client.delete(_real_uuid(3))
+
+        self.assertEqual(_real_uuid(0), client.find_uuid("node-0"))
+
+    def test_concurrent_creates_update_index(self):
+        client = self._client()
+        client.list()
+        self.adapter.get.reset_mock()
+        self.adapter.post.side_effect = lambda path, json: _response(
+            dict(json, uuid=_real_uuid(100 + int(json["name"][5:])))
+        )
+        cache_set = mock.patch.object(
+            client.cache, "set", wraps=client.cache.set
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+        results = list(
+            bounded_map(
+                client.create, [{"name": f"node-{n}"} for n in range(100, 300)], 16
+            )
+        )
+
+        self.assertEqual([], [error for _, _, error in results if error])
+        # Only the response cache is invalidated, the index is not rewritten.
+        cache_set.assert_not_called()
+        client.save_name_index()
+        cache_set.assert_called_once()
+
+        self.assertEqual(_real_uuid(250), self._client().find_uuid("node-150"))
+        self.adapter.get.assert_not_called()
+
+
+class TestClientGetMany(unittest.TestCase):
+    def setUp(self):
+        self.adapter = mock.Mock()
+        self.inventory = [_hardware(n) for n in range(100)]
+        self.adapter.get.side_effect = self._get
+
+    def _get(self, path, **kwargs):
+        if path == "/v1/hardware/":
+            return _response({"hardware": self.inventory})
+        for hardware in self.inventory:
+            if path == f"/v1/hardware/{hardware['uuid']}/":
+                return _response(hardware)
+        raise NotFound()
+
+    def _paths(self):
+        return [c.args[0] for c in self.adapter.get.call_args_list]
+
+    def test_few_items_are_fetched_individually(self):
+        client = Client(self.adapter)
+
+        items, missing = client.get_many(["uuid-7", "uuid-404", "uuid-3", "uuid-7"])
+
+        self.assertEqual([_hardware(7), _hardware(3)], items)
+        self.assertEqual(["uuid-404"], missing)
+        self.assertNotIn("/v1/hardware/", self._paths())
+        self.assertEqual(3, len(self._paths()))
+
+    def test_many_items_are_filtered_from_one_listing(self):
+        client = Client(self.adapter)
+        uuids = [f"uuid-{n}" for n in range(60, 0, -1)] + ["uuid-404"]
+
+        items, missing = client.get_many(uuids)
+
+        self.assertEqual([_hardware(n) for n in range(60, 0, -1)], items)
+        self.assertEqual(["uuid-404"], missing)
+        # Only the item missing from the listing is fetched on its own.
+        self.assertEqual(["/v1/hardware/", "/v1/hardware/uuid-404/"], self._paths())
+
+    def test_items_missing_from_listing_are_fetched(self):
+        # Hardware of other projects is not listed, but can be fetched.
+        listed = self.inventory[:90]
+        self.adapter.get.side_effect = lambda path, **kwargs: (
+            _response({"hardware": listed})
+            if path == "/v1/hardware/"
+            else self._get(path)
+        )
+        client = Client(self.adapter)
+        uuids = [f"uuid-{n}" for n in range(100)]
+
+        items, missing = client.get_many(uuids)
+
+        self.assertEqual(self.inventory, items)
+        self.assertEqual([], missing)
+        self.assertEqual(11, len(self._paths()))
+
+    def test_strategy_follows_known_inventory_size(self):
+        client = Client(self.adapter)
+        client.list()
+        self.adapter.get.reset_mock()
+
+        # 10% of the known inventory is enough to prefer a listing.
+        client.get_many([f"uuid-{n}" for n in range(10)])
+        self.assertEqual(["/v1/hardware/"], self._paths())
+
+        self.adapter.get.reset_mock()
+        client.get_many([f"uuid-{n}" for n in range(9)])
+        self.assertEqual(9, len(self._paths()))
+
+    def test_errors_other_than_not_found_are_raised(self):
+        self.adapter.get.side_effect = RuntimeError("boom")
+        client = Client(self.adapter)
+
+        self.assertRaises(RuntimeError, client.get_many, ["uuid-1"])
+
+
+class TestClientFilters(unittest.TestCase):
+    def setUp(self):
+        self.adapter = mock.Mock()
+        self.inventory = [
+            {
+                "uuid": f"uuid-{n}",
+                "name": f"c0{n % 2}-n{n}",
+                "hardware_type": "baremetal",
+                "workers": [
+                    {"worker_type": "ironic", "state": "ERROR" if n < 2 else "STEADY"}
+                ],
+            }
+            for n in range(4)
+        ]
+
+    def test_filters_are_sent_as_query_parameters(self):
+        matching = self.inventory[:2]
+        self.adapter.get.return_value = _response({"hardware": matching})
+        client = Client(self.adapter)
+
+        hardware = client.list(worker_type="ironic", worker_state="ERROR")
+
+        self.assertEqual(matching, hardware)
+        self.adapter.get.assert_called_once_with(
+            "/v1/hardware/",
+            params={"worker_type": "ironic", "worker_state": "ERROR"},
+        )
+        # A filtered listing says nothing about the other names.
+        self.assertIsNone(client._name_index)
+
+    def test_ignored_filters_are_applied_locally(self):
+        self.adapter.get.return_value = _response({"hardware": self.inventory})
+        client = Client(self.adapter)
+
+        hardware = client.list(worker_state="ERROR", name_prefix="c01-")
+
+        self.assertEqual([self.inventory[1]], hardware)
+
+    def test_rejected_filters_fall_back_to_local_filtering(self):
+        def get(path, params=None, **kwargs):
+            if params and "worker_state" in params:
+                raise BadRequest()
+            return _response({"hardware": self.inventory})
+
+        self.adapter.get.side_effect = get
+        client = Client(self.adapter)
+
+        hardware = list(client.iter_list(page_size=10, worker_state="STEADY"))
+
+        self.assertEqual(self.inventory[2:], hardware)
+        self.assertFalse(client.filter_pushdown)
+        self.assertEqual(self.inventory[2:], client.export(worker_state="STEADY"))
+
+    def test_unknown_filter(self):
+        self.assertRaises(TypeError, Client(self.adapter).list, color="red")
+
+
+class TestClientConnectionPool(unittest.TestCase):
+    endpoint = "https://doni.example.com/inventory"
+
+    def setUp(self):
+        self.adapter = mock.Mock()
+        self.adapter.session.session = requests.Session()
+        self.adapter.get_endpoint.return_value = self.endpoint
+
+    def _pool_adapter(self, url=endpoint + "/v1/hardware/"):
+        return self.adapter.session.session.get_adapter(url)
+
+    def test_defaults_leave_session_alone(self):
+        default = self._pool_adapter()
+        client = Client(self.adapter)
+        self.assertIs(default, self._pool_adapter())
+        # Reservations within the default size keep the session's pool.
+        client.reserve_connections(8)
+        self.assertIs(default, self._pool_adapter())
+
+    def test_pool_options(self):
+        Client(self.adapter, pool_connections=2, pool_maxsize=50)
+        pool = self._pool_adapter()
+        self.assertIsInstance(pool, TCPKeepAliveAdapter)
+        self.assertEqual(50, pool._pool_maxsize)
+        self.assertEqual(2, pool._pool_connections)
+
+    def test_pool_is_only_used_for_inventory(self):
+        default = self._pool_adapter("https://keystone.example.com/v3/")
+        Client(self.adapter, pool_maxsize=50)
+        self.assertIs(default, self._pool_adapter("https://keystone.example.com/v3/"))
+        self.assertIs(default, self._pool_adapter("https://doni.example.com/other/"))
+
+    def test_disable_keepalive(self):
+        Client(self.adapter, keepalive=False)
+        self.assertNotIsInstance(self._pool_adapter(), TCPKeepAliveAdapter)
+
+    def test_reserve_connections(self):
+        client = Client(self.adapter)
+        client.reserve_connections(32)
+        pool = self._pool_adapter()
+        self.assertEqual(32, pool._pool_maxsize)
+        # Smaller reservations keep the existing pool and its connections.
+        client.reserve_connections(4)
+        self.assertIs(pool, self._pool_adapter())
+
+        with mock.patch.object(pool, "close") as close:
+            client.reserve_connections(64)
+        close.assert_called_once_with()
+        self.assertEqual(64, self._pool_adapter()._pool_maxsize)
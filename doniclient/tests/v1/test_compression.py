@@ -0,0 +1,45 @@
+import gzip
+import io
+import unittest
+
+from doniclient.v1.compression import (
+    GZIP,
+    ZSTD,
+    compression_for_path,
+    open_reader,
+    open_writer,
+)
+from doniclient.v1.jsonstream import iter_binary_file_chunks
+
+
+class TestCompression(unittest.TestCase):
+    data = '{"name": "nœud-1"}\n'.encode("utf-8") * 100
+
+    def test_compression_for_path(self):
+        self.assertEqual(GZIP, compression_for_path("hardware.ndjson.gz"))
+        self.assertEqual(ZSTD, compression_for_path("hardware.ndjson.zst"))
+        self.assertIsNone(compression_for_path("hardware.ndjson"))
+
+    def test_gzip_round_trip(self):
+        buf = io.BytesIO()
+        writer = open_writer(buf, GZIP)
+        writer.write(self.data)
+        writer.close()
+
+        self.assertFalse(buf.closed)
+        self.assertEqual(self.data, gzip.decompress(buf.getvalue()))
+        self.assertEqual(self.data, open_reader(io.BytesIO(buf.getvalue())).read())
+
+    def test_uncompressed_passes_through(self):
+        buf = io.BytesIO()
+        writer = open_writer(buf)
+        writer.write(self.data)
+        writer.close()
+
+        self.assertEqual(self.data, open_reader(io.BytesIO(buf.getvalue())).read())
+
+    def test_binary_chunks_split_characters(self):
+        chunks = list(iter_binary_file_chunks(io.BytesIO(self.data), chunk_size=13))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(self.data.decode("utf-8"), "".join(chunks))
@@ -0,0 +1,95 @@
+import json
+import unittest
+
+from unittest import mock
+
+from doniclient.v1 import jsonstream
+from doniclient.v1.jsonstream import (
+    iter_json_array,
+    iter_json_items,
+    iter_response_chunks,
+)
+
+
+def _chunked(text, size):
+    return (text[i : i + size] for i in range(0, len(text), size))
+
+
+class TestJsonStream(unittest.TestCase):
+    items = [
+        {"name": "node-1", "properties": {"cpu_arch": "x86_64", "su_factor": 1.5}},
+        {"name": "node-2", "properties": {"interfaces": [{"mac": "aa:bb"}]}},
+        12345,
+        None,
+        "a string with ] and , inside",
+    ]
+
+    def test_array_across_chunk_boundaries(self):
+        text = json.dumps(self.items, indent=2)
+        for size in (1, 3, 7, 64, len(text)):
+            self.assertEqual(self.items, list(iter_json_array(_chunked(text, size))))
+
+    def test_numbers_split_across_chunks(self):
+        for chunks in (["[1, 2.", "5]"], ["[1, 2", ".5]"], ["[1e", "3, 2.5E", "-1]"]):
+            result = list(iter_json_array(chunks))
+            self.assertEqual(json.loads("".join(chunks)), result)
+        self.assertEqual([2.5, 3], list(iter_json_items(["2.", "5\n3"])))
+        result = list(
+            iter_json_array(['{"hardware": [], "total": 2.', "5}"], key="hardware")
+        )
+        self.assertEqual([], result)
+
+    def test_empty_array(self):
+        self.assertEqual([], list(iter_json_array([" [ ", " ] "])))
+
+    def test_ndjson(self):
+        text = "\n".join(json.dumps(item) for item in self.items) + "\n\n"
+        for size in (1, 5, len(text)):
+            self.assertEqual(self.items, list(iter_json_items(_chunked(text, size))))
+
+    def test_items_detects_array(self):
+        text = json.dumps(self.items)
+        self.assertEqual(self.items, list(iter_json_items(_chunked(text, 4))))
+
+    def test_items_are_yielded_before_end_of_input(self):
+        def chunks():
+            yield '[{"name": "node-1"}, '
+            raise AssertionError("read past the first item")
+
+        self.assertEqual({"name": "node-1"}, next(iter_json_array(chunks())))
+
+    def test_large_item_is_not_reparsed_per_chunk(self):
+        item = {"name": "node-1", "properties": {"blob": "x" * 100000}}
+        text = json.dumps([item])
+        decoder = mock.Mock(wraps=jsonstream._DECODER)
+
+        with mock.patch.object(jsonstream, "_DECODER", decoder):
+            result = list(iter_json_array(_chunked(text, 100)))
+
+        self.assertEqual([item], result)
+        # About a thousand chunks, but the item is only re-parsed each time
+        # the buffered data has doubled.
+        self.assertLess(decoder.raw_decode.call_count, 20)
+
+    def test_malformed_input(self):
+        self.assertRaises(ValueError, list, iter_json_array(['[{"a": 1} {"b": 2}]']))
+        self.assertRaises(ValueError, list, iter_json_array(['[{"a": 1']))
+
+    def test_array_under_key(self):
+        text = json.dumps({"count": 5, "hardware": self.items, "next": {"a": [1]}})
+        for size in (1, 9, len(text)):
+            result = list(iter_json_array(_chunked(text, size), key="hardware"))
+            self.assertEqual(self.items, result)
+
+    def test_missing_key(self):
+        self.assertEqual([], list(iter_json_array(['{"other": [1, 2]}'], key="x")))
+        self.assertEqual([], list(iter_json_array(["{}"], key="x")))
+
+    def test_response_chunks_split_multibyte_characters(self):
+        content = '{"hardware": [{"name": "n\u00f8de-\u2603"}]}'.encode("utf-8")
+        resp = mock.Mock(encoding=None)
+        resp.iter_content.return_value = [bytes([b]) for b in content]
+
+        result = list(iter_json_array(iter_response_chunks(resp), key="hardware"))
+
+        self.assertEqual([{"name": "n\u00f8de-\u2603"}], result)
@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from doniclient.v1.utils import bounded_map
+
+
+class TestBoundedMap(unittest.TestCase):
+    def test_results_in_input_order(self):
+        def slow_square(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+
+        results = list(bounded_map(slow_square, range(5), concurrency=4))
+
+        self.assertEqual([0, 1, 4, 9, 16], [result for _, result, _ in results])
+
+    def test_errors_are_returned_per_item(self):
+        def fail_on_odd(n):
+            if n % 2:
+                raise ValueError(n)
+            return n
+
+        results = list(bounded_map(fail_on_odd, range(4), concurrency=2))
+
+        self.assertEqual(
+            [None, ValueError, None, ValueError],
+            [type(err) if err else None for _, _, err in results],
+        )
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def track(n):
+            with lock:
+                active.append(n)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(n)
+
+        list(bounded_map(track, range(20), concurrency=3))
+
+        self.assertLessEqual(max(peak), 3)
+
+    def test_input_is_consumed_lazily(self):
+        consumed = []
+
+        def source():
+            for n in range(100):
+                consumed.append(n)
+                yield n
+
+        results = bounded_map(lambda n: n, source(), concurrency=2)
+        next(results)
+        results.close()
+
+        self.assertLessEqual(len(consumed), 4)
@@ -0,0 +1,190 @@
+"""Asyncio client for Doni, for issuing many requests concurrently.
+
+Requires the optional ``aiohttp`` package.
+"""
+import asyncio
+import json
+import logging
+import ssl
+
+from keystoneauth1.adapter import Adapter as ksa_adapter
+from keystoneauth1.exceptions import from_response
+
+from doniclient.v1.utils import is_uuid_like
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+LOG = logging.getLogger(__name__)  # Get the logger of this module
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+class _ErrorResponse(object):
+    """Minimal ``requests.Response`` look-alike for keystoneauth errors."""
+
+    def __init__(self, status, headers, text):
+        self.status_code = status
+        self.headers = headers
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncClient(object):
+    """Asyncio counterpart of :class:`doniclient.v1.client.Client`.
+
+    Requests are sent with aiohttp, authenticated with the token of the
+    keystoneauth ``adapter`` and sent to the endpoint it resolves, so an
+    existing session can be reused. At most ``max_concurrency`` requests are
+    in flight at any time; callers can ``gather`` as many coroutines as they
+    like. Connections are kept alive for ``keepalive_timeout`` seconds after
+    use (aiohttp's default when None) and reused by later requests; set
+    ``keepalive_timeout=0`` to close them after each request. Failed requests
+    raise the same keystoneauth ``HttpError`` subclasses as the synchronous
+    client.
+
+    The client must be used as an async context manager::
+
+        async with AsyncClient(adapter) as client:
+            await asyncio.gather(*(client.sync(uuid) for uuid in uuids))
+    """
+
+    def __init__(
+        self,
+        adapter: ksa_adapter,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        timeout=None,
+        keepalive_timeout=None,
+        **kwargs,
+    ):
+        if aiohttp is None:
+            raise ImportError("AsyncClient requires the aiohttp package.")
+        self.adapter = adapter
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self._endpoint = None
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        # The semaphore and session are created here so that they are bound to
+        # the running event loop.
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector_kwargs = {}
+        if self.keepalive_timeout == 0:
+            connector_kwargs["force_close"] = True
+        elif self.keepalive_timeout is not None:
+            connector_kwargs["keepalive_timeout"] = self.keepalive_timeout
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            ssl=self._get_ssl_context(),
+            **connector_kwargs,
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_ssl_context(self):
+        session = self.adapter.session
+        verify = getattr(session, "verify", True)
+        cert = getattr(session, "cert", None)
+        if verify is False:
+            return False
+        if verify is True and not cert:
+            return True
+        context = ssl.create_default_context(
+            cafile=verify if isinstance(verify, str) else None
+        )
+        if isinstance(cert, (tuple, list)):
+            context.load_cert_chain(*cert)
+        elif cert:
+            context.load_cert_chain(cert)
+        return context
+
+    async def _run_blocking(self, fn):
+        """Run a blocking keystoneauth call without stalling the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn)
+
+    async def _url(self, path):
+        if self._endpoint is None:
+            endpoint = await self._run_blocking(self.adapter.get_endpoint)
+            self._endpoint = endpoint.rstrip("/")
+        return f"{self._endpoint}/{path.lstrip('/')}"
+
+    async def _request(self, method, path, **kwargs):
+        """Send a request and return its decoded JSON body, if any."""
+        if self._session is None:
+            raise RuntimeError("AsyncClient must be opened before use.")
+        url = await self._url(path)
+        for retry in (True, False):
+            # Fetching a token may authenticate, so it is done in a thread
+            # and before taking one of the request slots.
+            token = await self._run_blocking(self.adapter.get_token)
+            headers = {"X-Auth-Token": token, "Accept": "application/json"}
+            async with self._semaphore, self._session.request(
+                method, url, headers=headers, **kwargs
+            ) as resp:
+                text = await resp.text()
+                if resp.status == 401 and retry:
+                    # The token may have been revoked; fetch a new one.
+                    await self._run_blocking(self.adapter.invalidate)
+                    continue
+                if resp.status >= 400:
+                    error_resp = _ErrorResponse(resp.status, resp.headers, text)
+                    raise from_response(error_resp, method, url)
+                return json.loads(text) if text else None
+
+    async def list(self):
+        body = await self._request("GET", "/v1/hardware/")
+        return body.get("hardware")
+
+    async def export(self):
+        body = await self._request("GET", "/v1/hardware/export/")
+        return body.get("hardware")
+
+    async def get_by_uuid(self, uuid):
+        return await self._request("GET", f"/v1/hardware/{uuid}/")
+
+    async def get(self, name_or_uuid):
+        if is_uuid_like(name_or_uuid):
+            return await self.get_by_uuid(name_or_uuid)
+        matches = [hw for hw in await self.list() if hw.get("name") == name_or_uuid]
+        if len(matches) != 1:
+            raise LookupError(
+                f"Expected one hardware item named '{name_or_uuid}', "
+                f"found {len(matches)}."
+            )
+        return matches[0]
+
+    async def get_availability(self, hardware_uuid: str):
+        body = await self._request("GET", f"/v1/hardware/{hardware_uuid}/availability")
+        return body.get("availability", [])
+
+    async def create(self, json, **kwargs):
+        """Create a hw object in the doni DB."""
+        return await self._request("POST", "/v1/hardware/", json=json)
+
+    async def delete(self, uuid):
+        return await self._request("DELETE", f"/v1/hardware/{uuid}/")
+
+    async def sync(self, uuid):
+        return await self._request("POST", f"/v1/hardware/{uuid}/sync")
+
+    async def update(self, uuid, json):
+        return await self._request("PATCH", f"/v1/hardware/{uuid}/", json=json)
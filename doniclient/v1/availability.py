@@ -0,0 +1,256 @@
+"""In-memory index of hardware availability windows.
+
+Windows of each hardware item are kept in an array sorted by start time, along
+with the running maximum of their end times, so that the windows overlapping a
+time range are found with a binary search instead of a scan of every window.
+"""
+import bisect
+import itertools
+from collections import namedtuple
+from datetime import datetime, timezone
+
+AVAILABLE = "available"
+PARTIAL = "partial"
+UNAVAILABLE = "unavailable"
+STATUSES = [AVAILABLE, PARTIAL, UNAVAILABLE]
+
+Window = namedtuple("Window", ["start", "end", "uuid"])
+
+
+def to_datetime(value):
+    """Parse an ISO 8601 timestamp. Naive timestamps are taken to be UTC."""
+    if not isinstance(value, datetime):
+        from dateutil import parser
+
+        value = parser.isoparse(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_window(window):
+    """Convert an availability window returned by the API into a Window."""
+    if isinstance(window, Window):
+        return window
+    return Window(
+        to_datetime(window["start"]), to_datetime(window["end"]), window.get("uuid")
+    )
+
+
+class WindowList(object):
+    """Availability windows of one hardware item, sorted by start time."""
+
+    def __init__(self, windows=()):
+        self._windows = sorted((to_window(w) for w in windows), key=lambda w: w[:2])
+        self._starts = [w.start for w in self._windows]
+        self._max_ends = list(itertools.accumulate((w.end for w in self._windows), max))
+        self._by_uuid = {w.uuid: w for w in self._windows if w.uuid is not None}
+
+    def __iter__(self):
+        return iter(self._windows)
+
+    def __len__(self):
+        return len(self._windows)
+
+    def get(self, window_uuid):
+        """Return the window with the given UUID, or None."""
+        return self._by_uuid.get(window_uuid)
+
+    def add(self, window):
+        """Insert a window, keeping the list sorted."""
+        window = to_window(window)
+        i = bisect.bisect_left(self._starts, window.start)
+        while i < len(self._windows) and self._windows[i][:2] <= window[:2]:
+            i += 1
+        self._windows.insert(i, window)
+        self._starts.insert(i, window.start)
+        previous = self._max_ends[i - 1] if i else window.end
+        self._max_ends.insert(i, max(previous, window.end))
+        # Later running maxima only change until one already exceeds the end.
+        for j in range(i + 1, len(self._max_ends)):
+            if self._max_ends[j] >= window.end:
+                break
+            self._max_ends[j] = window.end
+        if window.uuid is not None:
+            self._by_uuid[window.uuid] = window
+
+    def remove(self, window_uuid):
+        """Remove the window with the given UUID.
+
+        Raises:
+            KeyError: if there is no such window.
+        """
+        window = self._by_uuid.pop(window_uuid)
+        i = bisect.bisect_left(self._starts, window.start)
+        while self._windows[i].uuid != window_uuid:
+            i += 1
+        del self._windows[i]
+        del self._starts[i]
+        del self._max_ends[i]
+        # Recompute the running maxima until they match the old ones again.
+        running = self._max_ends[i - 1] if i else None
+        for j in range(i, len(self._windows)):
+            end = self._windows[j].end
+            running = end if running is None else max(running, end)
+            if self._max_ends[j] == running:
+                break
+            self._max_ends[j] = running
+
+    def overlapping(self, start, end):
+        """Return the windows overlapping ``[start, end)``, sorted by start."""
+        start, end = to_datetime(start), to_datetime(end)
+        # Only windows starting before ``end`` can overlap the range; walk
+        # back from the last of them until no earlier window ends after start.
+        i = bisect.bisect_left(self._starts, end)
+        found = []
+        while i > 0 and self._max_ends[i - 1] > start:
+            i -= 1
+            if self._windows[i].end > start:
+                found.append(self._windows[i])
+        found.reverse()
+        return found
+
+    def conflicts(self, start, end, exclude=None):
+        """Return the windows a new window ``[start, end)`` would overlap.
+
+        Args:
+            exclude (str): UUID of a window to ignore, e.g. the one that is
+                being replaced by the new window.
+        """
+        return [
+            w
+            for w in self.overlapping(start, end)
+            if exclude is None or w.uuid != exclude
+        ]
+
+    def merged(self):
+        """Return the windows with overlapping and adjacent ones combined."""
+        merged = []
+        for window in self._windows:
+            if merged and window.start <= merged[-1].end:
+                if window.end > merged[-1].end:
+                    merged[-1] = Window(merged[-1].start, window.end, None)
+            else:
+                merged.append(Window(window.start, window.end, None))
+        return merged
+
+    def gaps(self, start, end):
+        """Return the periods of ``[start, end)`` not covered by any window."""
+        start, end = to_datetime(start), to_datetime(end)
+        gaps = []
+        cursor = start
+        for window in self.overlapping(start, end):
+            if window.start > cursor:
+                gaps.append(Window(cursor, window.start, None))
+            cursor = max(cursor, window.end)
+        if cursor < end:
+            gaps.append(Window(cursor, end, None))
+        return gaps
+
+    def covers(self, start, end):
+        """Whether ``[start, end)`` lies entirely within the windows."""
+        return not self.gaps(start, end)
+
+    def status(self, start, end):
+        """Return AVAILABLE, PARTIAL or UNAVAILABLE for ``[start, end)``."""
+        if self.covers(start, end):
+            return AVAILABLE
+        if self.overlapping(start, end):
+            return PARTIAL
+        return UNAVAILABLE
+
+
+def validate_window(windows, start, end, window_uuid=None):
+    """Check a new or changed window against the existing ``windows``.
+
+    Args:
+        windows (WindowList): the current windows of the hardware item.
+        window_uuid (str): UUID of the window being changed, if any.
+
+    Raises:
+        ValueError: if the window is empty or overlaps another window.
+    """
+    start, end = to_datetime(start), to_datetime(end)
+    if start >= end:
+        raise ValueError(
+            f"Window start {start.isoformat()} is not before its end {end.isoformat()}."
+        )
+    conflicts = windows.conflicts(start, end, exclude=window_uuid)
+    if conflicts:
+        raise ValueError(
+            "Window overlaps availability window(s): "
+            + ", ".join(
+                f"{w.uuid} ({w.start.isoformat()} - {w.end.isoformat()})"
+                for w in conflicts
+            )
+        )
+
+
+def expand_rrule(rule, start, end, horizon):
+    """Lazily yield a Window for each occurrence of a recurrence rule.
+
+    Args:
+        rule (str): an RFC 5545 recurrence rule, e.g.
+            ``"FREQ=WEEKLY;INTERVAL=2;BYDAY=TU"``.
+        start (datetime): start of the first occurrence.
+        end (datetime): end of the first occurrence; every occurrence lasts
+            as long as the first one.
+        horizon (datetime): occurrences starting at or after this time are
+            not generated, so that unbounded rules can be expanded.
+
+    Raises:
+        ValueError: if the rule cannot be parsed.
+    """
+    from dateutil import rrule
+
+    duration = end - start
+    for occurrence in rrule.rrulestr(rule, dtstart=start, cache=False):
+        if occurrence >= horizon:
+            return
+        yield Window(occurrence, occurrence + duration, None)
+
+
+def missing_windows(windows, candidates):
+    """Yield the ``candidates`` not already covered by ``windows``."""
+    for candidate in candidates:
+        if not windows.covers(candidate.start, candidate.end):
+            yield candidate
+
+
+class AvailabilityIndex(object):
+    """Availability windows of many hardware items.
+
+    Args:
+        availability (dict): maps hardware UUIDs to their list of windows, as
+            returned by :meth:`doniclient.v1.client.Client.get_availability`.
+    """
+
+    def __init__(self, availability=None):
+        self._hardware = {}
+        for hardware_uuid, windows in (availability or {}).items():
+            self.set_windows(hardware_uuid, windows)
+
+    def __contains__(self, hardware_uuid):
+        return hardware_uuid in self._hardware
+
+    def __iter__(self):
+        return iter(self._hardware)
+
+    def set_windows(self, hardware_uuid, windows):
+        self._hardware[hardware_uuid] = WindowList(windows)
+
+    def windows(self, hardware_uuid):
+        return self._hardware.get(hardware_uuid) or WindowList()
+
+    def status(self, hardware_uuid, start, end):
+        return self.windows(hardware_uuid).status(start, end)
+
+    def query(self, start, end):
+        """Yield ``(hardware_uuid, status)`` for every indexed hardware item."""
+        start, end = to_datetime(start), to_datetime(end)
+        for hardware_uuid, windows in self._hardware.items():
+            yield hardware_uuid, windows.status(start, end)
+
+    def available(self, start, end):
+        """Return the UUIDs of hardware available for the whole range."""
+        return [uuid for uuid, status in self.query(start, end) if status == AVAILABLE]
@@ -0,0 +1,90 @@
+"""On-disk cache of Doni API responses."""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from doniclient.v1.defaults import DEFAULT_TTL
+
+LOG = logging.getLogger(__name__)  # Get the logger of this module
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for doniclient."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "doniclient")
+
+
+class ResponseCache(object):
+    """Stores decoded JSON responses along with their validators.
+
+    Entries are kept as one JSON file per request under ``path``, grouped in a
+    subdirectory per ``namespace`` (typically the endpoint and project the
+    responses belong to) so that a whole namespace can be dropped at once.
+    Entries younger than ``ttl`` seconds are returned as-is; older ones are
+    revalidated by the client with a conditional request using the stored
+    ``ETag`` and ``Last-Modified`` values. Setting ``refresh`` forces every
+    entry to be revalidated regardless of its age.
+
+    The directory is created readable only by the current user, since
+    hardware properties may contain credentials.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, refresh=False):
+        self.path = path or default_cache_dir()
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def _namespace_dir(self, namespace):
+        digest = hashlib.sha256(namespace.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, digest[:16])
+
+    def _entry_path(self, namespace, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._namespace_dir(namespace), digest + ".json")
+
+    def get(self, namespace, key):
+        """Return the stored entry for ``key``, or None."""
+        try:
+            with open(self._entry_path(namespace, key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        return not self.refresh and time.time() - entry["stored_at"] < ttl
+
+    def set(self, namespace, key, body, etag=None, last_modified=None):
+        entry = {
+            "key": key,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        }
+        directory = self._namespace_dir(namespace)
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial
+            # entry, even with several processes sharing the cache.
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._entry_path(namespace, key))
+        except OSError as ex:
+            LOG.debug("Could not write cache entry for %s: %s", key, ex)
+        return entry
+
+    def touch(self, namespace, key, entry):
+        """Mark ``entry`` as freshly validated."""
+        return self.set(
+            namespace, key, entry["body"], entry["etag"], entry["last_modified"]
+        )
+
+    def clear(self, namespace):
+        """Drop every entry stored for ``namespace``."""
+        shutil.rmtree(self._namespace_dir(namespace), ignore_errors=True)
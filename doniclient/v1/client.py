@@ -1,60 +1,566 @@
 """Creates doni client object."""
+import atexit
+import itertools
 import json
 import logging
+import threading
+import weakref
+from typing import TYPE_CHECKING
+from urllib.parse import urlencode
 
+import requests
 from keystoneauth1.adapter import Adapter as ksa_adapter
+from keystoneauth1.exceptions import BadRequest, NotFound
+from keystoneauth1.session import TCPKeepAliveAdapter
+
+from doniclient.v1.defaults import DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from doniclient.v1.jsonstream import iter_json_array, iter_response_chunks
+from doniclient.v1.utils import bounded_map, is_uuid_like
+
+if TYPE_CHECKING:
+    from doniclient.v1.cache import ResponseCache
 
 LOG = logging.getLogger(__name__)  # Get the logger of this module
 
+# How long a persisted name to UUID index is trusted, in seconds.
+NAME_INDEX_TTL = 300
+
+# get_many lists the whole inventory instead of fetching items one by one when
+# asked for at least this fraction of it, or for at least GET_MANY_LIST_MIN
+# items when the inventory size is not known yet.
+GET_MANY_LIST_RATIO = 0.1
+GET_MANY_LIST_MIN = 50
+
+# Filters accepted by the listing methods, sent as query parameters of the
+# same name.
+LIST_FILTERS = (
+    "worker_type",
+    "worker_state",
+    "hardware_type",
+    "name_prefix",
+    "project_id",
+)
+
+
+def matches_hardware_filters(hardware, filters):
+    """Check a hardware item against filters accepted by Client.list.
+
+    With only ``worker_state``, any worker in that state matches. With both
+    worker filters, the worker of type ``worker_type`` must be in that state.
+    """
+    for field in ("hardware_type", "project_id"):
+        if filters.get(field) and hardware.get(field) != filters[field]:
+            return False
+    name_prefix = filters.get("name_prefix")
+    if name_prefix and not (hardware.get("name") or "").startswith(name_prefix):
+        return False
+    workers = hardware.get("workers") or []
+    if filters.get("worker_type"):
+        workers = [w for w in workers if w.get("worker_type") == filters["worker_type"]]
+        if not workers:
+            return False
+    if filters.get("worker_state"):
+        return any(w.get("state") == filters["worker_state"] for w in workers)
+    return True
+
+
+# Clients whose name index has changes not yet written to the cache.
+_UNSAVED_NAME_INDEXES = weakref.WeakSet()
+
+
+@atexit.register
+def _save_name_indexes():
+    for client in list(_UNSAVED_NAME_INDEXES):
+        client.save_name_index()
+
+
+def _clean_filters(filters):
+    unknown = set(filters) - set(LIST_FILTERS)
+    if unknown:
+        raise TypeError(f"Unknown hardware filter(s): {', '.join(sorted(unknown))}")
+    return {key: value for key, value in filters.items() if value}
+
 
 class Client(object):
-    def __init__(self, adapter: ksa_adapter, **kwargs):
+    def __init__(
+        self,
+        adapter: ksa_adapter,
+        cache: "ResponseCache" = None,
+        pool_connections=None,
+        pool_maxsize=None,
+        keepalive=True,
+        filter_pushdown=True,
+        **kwargs,
+    ):
         self.adapter = adapter
+        self.cache = cache
+        # Whether listing filters are sent to the server. Turned off if the
+        # server rejects them; results are always filtered locally as well.
+        self.filter_pushdown = filter_pushdown
+        self.pool_connections = pool_connections or DEFAULT_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        self.keepalive = keepalive
+        self._pool_lock = threading.Lock()
+        self._mounted_pool_maxsize = None
+        if pool_connections or pool_maxsize or not keepalive:
+            self.configure_pool()
+        self._cache_namespace = None
+        # Maps hardware names to the UUIDs of the items with that name.
+        self._name_index = None
+        # Guards the name index, which concurrent requests update.
+        self._name_index_lock = threading.RLock()
+        # Whether the index has changed since it was last written to the cache.
+        self._name_index_unsaved = False
+        # Whether the index was built from a listing made by this client.
+        self._name_index_current = False
+        # Number of items in the last complete listing.
+        self._inventory_size = None
+
+    def configure_pool(self):
+        """Replace the HTTP connection pool used for the inventory endpoint.
+
+        The pool is mounted on the ``requests`` session wrapped by the
+        adapter's keystoneauth session, for the inventory endpoint only, since
+        that session is shared with every other service. It has room for
+        ``pool_maxsize`` connections per host. With ``keepalive`` (the
+        default), the TCP keep-alive socket options keystoneauth normally uses
+        are kept. The pool it replaces is closed.
+        """
+        requests_session = getattr(self.adapter.session, "session", None)
+        if not isinstance(requests_session, requests.Session):
+            return
+        prefix = self.adapter.get_endpoint().rstrip("/") + "/"
+        adapter_class = (
+            TCPKeepAliveAdapter if self.keepalive else requests.adapters.HTTPAdapter
+        )
+        previous = requests_session.adapters.get(prefix)
+        requests_session.mount(
+            prefix,
+            adapter_class(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+            ),
+        )
+        if previous is not None:
+            previous.close()
+        self._mounted_pool_maxsize = self.pool_maxsize
+        LOG.debug("Using HTTP connection pools of size %s", self.pool_maxsize)
+
+    def reserve_connections(self, concurrency):
+        """Grow the connection pool to serve ``concurrency`` parallel requests.
 
-    def list(self):
-        resp = self.adapter.get("/v1/hardware/")
+        Without this, threads beyond the pool size open new connections (and
+        TLS sessions) for every request and discard them afterwards. The pool
+        is only replaced when it has to grow, so that its open connections are
+        kept otherwise.
+        """
+        with self._pool_lock:
+            # Until a pool is mounted, the session's default pools are in use,
+            # which have the default size.
+            mounted = self._mounted_pool_maxsize or DEFAULT_POOL_MAXSIZE
+            if concurrency > mounted:
+                self.pool_maxsize = max(self.pool_maxsize, concurrency)
+                self.configure_pool()
+
+    def list(self, **filters):
+        """List hardware, optionally filtered.
+
+        Filters (see LIST_FILTERS) are sent to the server as query parameters
+        and also applied to the response, so that they work with servers that
+        ignore them.
+        """
+        return self._list("/v1/hardware/", filters)
+
+    def export(self, **filters):
+        return self._list("/v1/hardware/export/", filters)
+
+    def iter_list(self, page_size=None, stream=True, **filters):
+        """Lazily iterate over hardware, fetching ``page_size`` items at a time."""
+        return self._iter_filtered("/v1/hardware/", page_size, stream, filters)
+
+    def iter_export(self, page_size=None, stream=True, **filters):
+        """Lazily iterate over all hardware, fetching ``page_size`` items at a time."""
+        return self._iter_filtered("/v1/hardware/export/", page_size, stream, filters)
+
+    def _filter_params(self, filters):
+        return dict(filters) if self.filter_pushdown else {}
+
+    def _disable_filter_pushdown(self):
+        LOG.debug("Server rejected hardware filters, filtering locally instead")
+        self.filter_pushdown = False
+
+    def _list(self, path, filters):
+        filters = _clean_filters(filters)
+        params = self._filter_params(filters)
         try:
-            return resp.json().get("hardware")
-        except json.JSONDecodeError:
-            return resp
+            hardware = self._get_json(path, key="hardware", params=params)
+        except BadRequest:
+            if not params:
+                raise
+            self._disable_filter_pushdown()
+            hardware = self._get_json(path, key="hardware")
+        if not filters:
+            self._index_names(hardware)
+            return hardware
+        if not isinstance(hardware, list):
+            return hardware
+        return [hw for hw in hardware if matches_hardware_filters(hw, filters)]
 
-    def export(self):
-        resp = self.adapter.get("/v1/hardware/export/")
+    def _iter_filtered(self, path, page_size, stream, filters):
+        filters = _clean_filters(filters)
+        params = self._filter_params(filters)
+        # Only a complete listing can be used to rebuild the name index.
+        index_names = not filters
+        pages = self._iter_pages(path, page_size, stream, params, index_names)
         try:
-            return resp.json().get("hardware")
-        except json.JSONDecodeError:
-            return resp
+            first = next(pages, None)
+        except BadRequest:
+            if not params:
+                raise
+            self._disable_filter_pushdown()
+            pages = self._iter_pages(path, page_size, stream, {}, index_names)
+            first = next(pages, None)
+        if first is None:
+            return
+        for hardware in itertools.chain([first], pages):
+            if matches_hardware_filters(hardware, filters):
+                yield hardware
 
-    def get_by_uuid(self, uuid):
-        resp = self.adapter.get(f"/v1/hardware/{uuid}/")
+    def _iter_pages(
+        self, path, page_size=None, stream=True, params=None, index_names=True
+    ):
+        """Yield hardware from ``path``, following marker/limit pagination.
+
+        Each page is requested with ``limit=page_size`` and the ``marker`` set
+        to the UUID of the last item of the previous page. Servers that do not
+        paginate return everything in the first response, in which case no
+        further requests are made.
+
+        With ``stream``, each response body is decoded incrementally and items
+        are yielded as soon as they are parsed, instead of after the whole
+        body has been downloaded and decoded.
+        """
+        base_params = dict(params or {})
+        page_params = dict(base_params, limit=page_size) if page_size else base_params
+        first_uuid = None
+        # Only names and UUIDs are kept, to rebuild the name index at the end.
+        names = []
+        while True:
+            count = 0
+            last_uuid = None
+            for hardware in self._iter_page(path, page_params, stream):
+                if count == 0:
+                    if first_uuid is None:
+                        first_uuid = hardware.get("uuid")
+                    elif hardware.get("uuid") == first_uuid:
+                        # The marker was ignored and we got the first page again.
+                        count = 0
+                        break
+                count += 1
+                last_uuid = hardware.get("uuid")
+                if index_names:
+                    names.append({"name": hardware.get("name"), "uuid": last_uuid})
+                yield hardware
+            if not page_size or count != page_size:
+                if index_names:
+                    self._index_names(names)
+                return
+            page_params = dict(base_params, limit=page_size, marker=last_uuid)
+
+    def _iter_page(self, path, params, stream=True):
+        if not stream or self.cache:
+            yield from self._get_json(path, key="hardware", default=[], params=params)
+            return
+        resp = self.adapter.get(path, params=params, stream=True)
         try:
-            return resp.json()
+            yield from iter_json_array(iter_response_chunks(resp), key="hardware")
+        finally:
+            resp.close()
+
+    def _get_json(self, path, key=None, default=None, params=None):
+        """GET ``path`` and return its decoded JSON body, or ``body[key]``.
+
+        If the body is not valid JSON, the response itself is returned. When a
+        cache is configured, fresh entries are served without a request and
+        stale ones are revalidated with a conditional GET.
+        """
+        kwargs = {"params": params} if params else {}
+        entry = None
+        if self.cache:
+            cache_key = self._cache_key(path, params)
+            entry = self.cache.get(self._get_cache_namespace(), cache_key)
+            if entry and self.cache.is_fresh(entry):
+                LOG.debug("Using cached response for %s", cache_key)
+                return self._select(entry["body"], key, default)
+            headers = {}
+            if entry and entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry and entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            if headers:
+                kwargs["headers"] = headers
+
+        resp = self.adapter.get(path, **kwargs)
+        if entry and resp.status_code == 304:
+            entry = self.cache.touch(self._get_cache_namespace(), cache_key, entry)
+            return self._select(entry["body"], key, default)
+        try:
+            body = resp.json()
         except json.JSONDecodeError:
             return resp
+        if self.cache:
+            self.cache.set(
+                self._get_cache_namespace(),
+                cache_key,
+                body,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+            )
+        return self._select(body, key, default)
+
+    @staticmethod
+    def _select(body, key, default):
+        return body.get(key, default) if key else body
+
+    @staticmethod
+    def _cache_key(path, params=None):
+        if not params:
+            return path
+        return f"{path}?{urlencode(sorted(params.items()))}"
+
+    def _get_cache_namespace(self):
+        """Identify the endpoint and project that responses belong to."""
+        if self._cache_namespace is None:
+            self._cache_namespace = (
+                f"{self.adapter.get_endpoint()}|{self.adapter.get_project_id()}"
+            )
+        return self._cache_namespace
+
+    def invalidate_cache(self):
+        """Drop all cached responses for this client's endpoint and project."""
+        if self.cache:
+            self.cache.clear(self._get_cache_namespace())
+
+    def _index_names(self, hardware):
+        """Rebuild the name index from a complete hardware listing."""
+        if not isinstance(hardware, list):
+            return
+        self._inventory_size = len(hardware)
+        index = {}
+        for item in hardware:
+            name, uuid = item.get("name"), item.get("uuid")
+            if name and uuid:
+                index.setdefault(name, []).append(uuid)
+        self._name_index_current = True
+        self._save_name_index(index)
+
+    def _get_name_index_namespace(self):
+        # Kept apart from responses so that writes do not discard the index.
+        return f"{self._get_cache_namespace()}|names"
+
+    def _get_name_index(self):
+        with self._name_index_lock:
+            if self._name_index is None and self.cache:
+                namespace = self._get_name_index_namespace()
+                entry = self.cache.get(namespace, "name_index")
+                if entry and self.cache.is_fresh(entry, ttl=NAME_INDEX_TTL):
+                    self._name_index = entry["body"]
+            return self._name_index
+
+    def _save_name_index(self, index):
+        with self._name_index_lock:
+            self._name_index = index
+            self._name_index_unsaved = True
+            self.save_name_index()
+
+    def save_name_index(self):
+        """Write the name index to the cache if it has unsaved changes.
+
+        Creates, renames and deletes only update the index in memory; it is
+        written once at the end of a batch of them (and at exit), rather than
+        after each one.
+        """
+        with self._name_index_lock:
+            if not self._name_index_unsaved:
+                return
+            self._name_index_unsaved = False
+            _UNSAVED_NAME_INDEXES.discard(self)
+            if self.cache and self._name_index is not None:
+                index = {name: list(uuids) for name, uuids in self._name_index.items()}
+                self.cache.set(self._get_name_index_namespace(), "name_index", index)
+
+    def _name_index_changed(self):
+        self._name_index_unsaved = True
+        if self.cache:
+            _UNSAVED_NAME_INDEXES.add(self)
+
+    def _remember_name(self, name, uuid):
+        with self._name_index_lock:
+            index = self._get_name_index()
+            if index is not None and name:
+                uuids = index.setdefault(name, [])
+                if uuid not in uuids:
+                    uuids.append(uuid)
+                self._name_index_changed()
+
+    def _forget_uuid(self, uuid):
+        with self._name_index_lock:
+            index = self._get_name_index()
+            if index is None:
+                return
+            for name, uuids in list(index.items()):
+                if uuid in uuids:
+                    uuids.remove(uuid)
+                    if not uuids:
+                        del index[name]
+                    self._name_index_changed()
+
+    def find_uuid(self, name_or_uuid):
+        """Return the UUID of the hardware with the given name or UUID.
+
+        UUIDs are returned as-is. Names are resolved through an index built
+        from the last ``list``/``export`` response (persisted for a few minutes
+        when a cache is configured); the inventory is only listed again if the
+        name is not in an index that was loaded from disk.
+
+        Raises:
+            LookupError: if no hardware, or more than one, has this name.
+        """
+        if is_uuid_like(name_or_uuid):
+            return name_or_uuid
+        index = self._get_name_index()
+        missing = index is None or name_or_uuid not in index
+        if missing and not self._name_index_current:
+            self.list()
+            index = self._name_index or {}
+        uuids = index.get(name_or_uuid)
+        if not uuids:
+            raise LookupError(f"No hardware exists with the name '{name_or_uuid}'.")
+        if len(uuids) > 1:
+            raise LookupError(
+                f"More than one hardware item exists with the name '{name_or_uuid}'."
+            )
+        return uuids[0]
+
+    def get_by_uuid(self, uuid):
+        return self._get_json(f"/v1/hardware/{uuid}/")
 
     def get(self, name_or_uuid):
-        return self.get_by_uuid(name_or_uuid)
+        """Fetch hardware by UUID, or by name without a failed request first."""
+        if is_uuid_like(name_or_uuid):
+            return self.get_by_uuid(name_or_uuid)
+        try:
+            data = self.get_by_uuid(self.find_uuid(name_or_uuid))
+            stale = data.get("name") != name_or_uuid
+        except NotFound:
+            stale = True
+        if stale and not self._name_index_current:
+            # The persisted index is out of date; rebuild it and try again.
+            self.list()
+            data = self.get_by_uuid(self.find_uuid(name_or_uuid))
+        elif stale:
+            raise LookupError(f"No hardware exists with the name '{name_or_uuid}'.")
+        return data
+
+    def get_many(self, uuids, concurrency=8):
+        """Fetch several hardware items by UUID.
+
+        Depending on how many items are requested compared to the size of the
+        inventory (as seen by the last listing, or the persisted name index),
+        either one listing is made and filtered, or the items are fetched
+        individually with up to ``concurrency`` requests in flight. Items the
+        listing does not include, such as hardware of other projects, are
+        then fetched individually, so both strategies find the same items.
+
+        Returns:
+            tuple: the items found, in the order of ``uuids`` (without
+                duplicates), and the list of UUIDs that do not exist.
+        """
+        uuids = list(dict.fromkeys(uuids))
+        found = {}
+        if self._should_list(len(uuids)):
+            by_uuid = {hw.get("uuid"): hw for hw in self.list()}
+            found = {uuid: by_uuid[uuid] for uuid in uuids if uuid in by_uuid}
+        remaining = [uuid for uuid in uuids if uuid not in found]
+        if remaining:
+            self.reserve_connections(concurrency)
+            for uuid, data, error in bounded_map(
+                self.get_by_uuid, remaining, concurrency
+            ):
+                if isinstance(error, NotFound):
+                    continue
+                elif error:
+                    raise error
+                found[uuid] = data
+        items = [found[uuid] for uuid in uuids if uuid in found]
+        missing = [uuid for uuid in uuids if uuid not in found]
+        return items, missing
+
+    def _should_list(self, count):
+        size = self._inventory_size
+        if size is None:
+            with self._name_index_lock:
+                index = self._get_name_index()
+                if index is not None:
+                    size = sum(len(uuids) for uuids in index.values())
+        if size is None:
+            return count >= GET_MANY_LIST_MIN
+        return count >= GET_MANY_LIST_RATIO * size
 
     def get_availability(self, hardware_uuid: str):
-        resp = self.adapter.get(f"/v1/hardware/{hardware_uuid}/availability")
-        try:
-            return resp.json().get("availability", [])
-        except json.JSONDecodeError:
-            return resp
+        return self._get_json(
+            f"/v1/hardware/{hardware_uuid}/availability", key="availability", default=[]
+        )
+
+    def get_availability_many(self, hardware_uuids, concurrency=8):
+        """Fetch the availability windows of several hardware items.
+
+        Up to ``concurrency`` requests are in flight at a time.
+
+        Returns:
+            tuple: a dict of the windows of each hardware item, in the order
+                of ``hardware_uuids``, and a dict of the exception raised for
+                each item whose windows could not be fetched.
+        """
+        hardware_uuids = list(dict.fromkeys(hardware_uuids))
+        self.reserve_connections(concurrency)
+        availability, errors = {}, {}
+        for uuid, windows, error in bounded_map(
+            self.get_availability, hardware_uuids, concurrency
+        ):
+            if error:
+                errors[uuid] = error
+            else:
+                availability[uuid] = windows
+        return availability, errors
 
     def create(self, json, **kwargs):
         """Create a hw object in the doni DB."""
         resp = self.adapter.post("/v1/hardware/", json=json)
+        self.invalidate_cache()
         try:
-            return resp.json()
+            data = resp.json()
         except json.JSONDecodeError:
             return resp
+        self._remember_name(data.get("name"), data.get("uuid"))
+        return data
 
     def delete(self, uuid):
-        return self.adapter.delete(f"/v1/hardware/{uuid}/")
+        resp = self.adapter.delete(f"/v1/hardware/{uuid}/")
+        self.invalidate_cache()
+        self._forget_uuid(uuid)
+        return resp
 
     def sync(self, uuid):
-        return self.adapter.post(f"/v1/hardware/{uuid}/sync")
+        resp = self.adapter.post(f"/v1/hardware/{uuid}/sync")
+        self.invalidate_cache()
+        return resp
 
     def update(self, uuid, json):
-        return self.adapter.patch(f"/v1/hardware/{uuid}/", json=json).json()
+        resp = self.adapter.patch(f"/v1/hardware/{uuid}/", json=json)
+        self.invalidate_cache()
+        data = resp.json()
+        if any(op.get("path") == "/name" for op in json):
+            self._forget_uuid(uuid)
+            self._remember_name(data.get("name"), uuid)
+        return data
@@ -0,0 +1,94 @@
+"""Transparent gzip and zstd compression of file streams.
+
+gzip is in the standard library. zstd needs the optional ``zstandard``
+package, which is only imported when a zstd stream is actually read or
+written.
+"""
+import gzip
+import io
+
+GZIP = "gzip"
+ZSTD = "zstd"
+COMPRESSIONS = [GZIP, ZSTD]
+
+_MAGIC = {
+    GZIP: b"\x1f\x8b",
+    ZSTD: b"\x28\xb5\x2f\xfd",
+}
+_SUFFIXES = {
+    ".gz": GZIP,
+    ".zst": ZSTD,
+}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the zstandard package.")
+    return zstandard
+
+
+def compression_for_path(path):
+    """Guess the compression of a file from its suffix, or return None."""
+    for suffix, compression in _SUFFIXES.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def detect_compression(fp):
+    """Return the compression of a binary stream from its first bytes, or None.
+
+    The stream must support ``peek``, as buffered readers do; no data is
+    consumed from it.
+    """
+    head = fp.peek(4)[:4]
+    for compression, magic in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_reader(fp):
+    """Return a binary stream of the decompressed contents of ``fp``.
+
+    The compression is detected from the data, so uncompressed input is
+    returned as is.
+    """
+    if not hasattr(fp, "peek"):
+        fp = io.BufferedReader(fp)
+    compression = detect_compression(fp)
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=fp, mode="rb")
+    if compression == ZSTD:
+        return _zstandard().ZstdDecompressor().stream_reader(fp)
+    return fp
+
+
+def open_writer(fp, compression=None):
+    """Return a binary stream that compresses what is written into ``fp``.
+
+    Closing the returned stream finishes the compressed data but leaves
+    ``fp`` open.
+    """
+    if compression == GZIP:
+        return gzip.GzipFile(fileobj=fp, mode="wb")
+    if compression == ZSTD:
+        return _zstandard().ZstdCompressor().stream_writer(fp, closefd=False)
+    if compression is not None:
+        raise ValueError(f"Unknown compression '{compression}'")
+    return _Uncompressed(fp)
+
+
+class _Uncompressed(object):
+    """Pass-through writer, so that callers can always close the writer."""
+
+    def __init__(self, fp):
+        self._fp = fp
+
+    def write(self, data):
+        return self._fp.write(data)
+
+    def close(self):
+        self._fp.flush()
@@ -0,0 +1,12 @@
+"""Default settings of the Doni client.
+
+Kept free of third-party imports so that the OpenStack client plugin can show
+them in its help without loading the client itself.
+"""
+
+# Seconds a cached response is used without revalidation.
+DEFAULT_TTL = 60
+
+# Same defaults as requests.adapters.HTTPAdapter.
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
@@ -0,0 +1,176 @@
+"""Incremental decoding of large JSON documents.
+
+The functions here decode JSON from an iterable of text chunks and yield each
+item as soon as it is complete, so that only one item (plus one chunk) has to
+be held in memory at a time.
+"""
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a number.
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _ChunkReader(object):
+    """Cursor over a stream of text chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size=0):
+        """Read chunks into the buffer. Returns False at EOF.
+
+        At least one chunk is read, and more until at least ``size``
+        characters are left to decode.
+        """
+        # Drop the part of the buffer that has already been decoded.
+        parts = [self._buf[self._pos :]]
+        length = len(parts[0])
+        while not self._eof and (len(parts) == 1 or length < size):
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        if len(parts) == 1:
+            return False
+        self._buf = "".join(parts)
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character, or "" at EOF."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found or 'EOF'}'")
+        self._pos += 1
+
+    def decode(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Each attempt parses the value from its start, so wait for the
+                # data to double before retrying; this keeps decoding a value
+                # that spans many chunks linear in its size.
+                if not self._fill(2 * (len(self._buf) - self._pos)):
+                    raise
+                continue
+            # A number may continue in the next chunk, including after a
+            # prefix that is valid on its own such as "2" of "2.5" or "1e3",
+            # so only accept it once it is followed by a character that cannot
+            # be part of it.
+            delimited = isinstance(value, (dict, list, str)) or (
+                end < len(self._buf) and self._buf[end] not in _NUMBER_CHARS
+            )
+            if delimited or not self._fill():
+                self._pos = end
+                return value
+
+
+def iter_json_array(chunks, key=None):
+    """Yield the elements of a JSON array.
+
+    Args:
+        chunks (iterable): the document as a sequence of ``str`` chunks.
+        key (str): if given, the document must be an object and the elements
+            of the array stored under ``key`` are yielded; other members of
+            the object are decoded and discarded. Otherwise the document
+            itself must be an array.
+    """
+    reader = _ChunkReader(chunks)
+    if key is None:
+        yield from _iter_array(reader)
+        return
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.decode()
+        reader.expect(":")
+        if name == key:
+            yield from _iter_array(reader)
+        else:
+            reader.decode()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
+
+def iter_json_items(chunks):
+    """Yield items from either a JSON array or a stream of JSON documents.
+
+    A document starting with ``[`` is treated as an array and its elements are
+    yielded. Anything else is read as a sequence of whitespace-separated JSON
+    values, which covers NDJSON (one JSON object per line).
+
+    Args:
+        chunks (iterable): the document as a sequence of ``str`` chunks.
+    """
+    reader = _ChunkReader(chunks)
+    if reader.peek() == "[":
+        yield from _iter_array(reader)
+        return
+    while reader.peek():
+        yield reader.decode()
+
+
+def iter_file_chunks(fp, chunk_size=CHUNK_SIZE):
+    """Read a file object in chunks of ``chunk_size``."""
+    return iter(lambda: fp.read(chunk_size), "")
+
+
+def iter_binary_file_chunks(fp, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    """Read a binary file object as text chunks of up to ``chunk_size`` bytes."""
+    return _decode_chunks(iter(lambda: fp.read(chunk_size), b""), encoding)
+
+
+def iter_response_chunks(resp, chunk_size=CHUNK_SIZE):
+    """Read the body of a streamed ``requests`` response as text chunks."""
+    return _decode_chunks(
+        resp.iter_content(chunk_size=chunk_size), resp.encoding or "utf-8"
+    )
+
+
+def _decode_chunks(chunks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _iter_array(reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.decode()
+        if reader.peek() == "]":
+            reader.expect("]")
+            return
+        reader.expect(",")
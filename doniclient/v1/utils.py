@@ -0,0 +1,61 @@
+"""Helpers shared by the Doni client and command line interface."""
+import collections
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+LOG = logging.getLogger(__name__)  # Get the logger of this module
+
+
+def is_uuid_like(value):
+    """Return True if ``value`` is a UUID, with or without dashes."""
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def bounded_map(fn, iterable, concurrency=1):
+    """Apply ``fn`` to each item of ``iterable`` on a bounded thread pool.
+
+    Results are yielded as ``(item, result, error)`` tuples in input order,
+    where ``error`` is the exception raised by ``fn`` (if any). The input is
+    consumed lazily: no more than ``2 * concurrency`` items are read ahead of
+    the consumer, so arbitrarily long inputs can be processed in constant
+    memory. Closing the generator early cancels items that have not started.
+
+    Args:
+        fn (callable): function called with a single item.
+        iterable (iterable): the items to process.
+        concurrency (int): maximum number of concurrent calls to ``fn``. A
+            value of 1 runs everything in the calling thread.
+    """
+    if concurrency <= 1:
+        for item in iterable:
+            try:
+                yield item, fn(item), None
+            except Exception as ex:
+                yield item, None, ex
+        return
+
+    pending = collections.deque()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for item in iterable:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= 2 * concurrency:
+                yield _future_result(*pending.popleft())
+        while pending:
+            yield _future_result(*pending.popleft())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _future_result(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as ex:
+        return item, None, ex
@@ -0,0 +1,37 @@
+"""Micro-benchmark of date parsing for availability windows.
+
+Compares flexible_datetime with parsing every value through dateutil, as it
+did before it gained a strict ISO 8601 fast path.
+
+    poetry run python tools/bench_flexible_datetime.py [count]
+"""
+import sys
+import timeit
+
+from dateutil import parser, tz
+
+from doniclient.osc.availability import flexible_datetime
+
+SAMPLES = [
+    "2021-08-03T06:00:00+00:00",
+    "2021-08-03T06:00Z",
+    "2021-08-03 06:00",
+    "2021-08-03",
+]
+
+
+def dateutil_datetime(date_str):
+    parsed_dt = parser.parse(date_str)
+    return parsed_dt.replace(tzinfo=parsed_dt.tzinfo or tz.gettz())
+
+
+def main(count=10000):
+    values = [SAMPLES[i % len(SAMPLES)] for i in range(count)]
+    for fn in (dateutil_datetime, flexible_datetime):
+        assert [fn(v) for v in SAMPLES] == [dateutil_datetime(v) for v in SAMPLES]
+        seconds = min(timeit.repeat(lambda: [fn(v) for v in values], number=1))
+        print(f"{fn.__name__:>20}: {seconds * 1000:8.1f} ms for {count} values")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""Micro-benchmark of rendering hardware properties in table cells.
+
+Compares YamlColumn with rendering every cell through the pure Python YAML
+emitter, as it did before it used libyaml and remembered its renderings, and
+with the compact JSON rendering of --nested-format json.
+
+    poetry run python tools/bench_yaml_column.py [rows] [distinct]
+"""
+import sys
+import timeit
+
+import yaml
+
+from doniclient.osc.common import JsonColumn, YamlColumn, _render_yaml
+
+
+def make_properties(i, distinct):
+    # Nodes of the same model share their interfaces and capabilities.
+    model = i % distinct
+    return {
+        "management_address": f"10.0.{i // 256}.{i % 256}",
+        "baremetal_capabilities": {
+            "boot_mode": "uefi",
+            "cpu_arch": "x86_64",
+            "model": f"model-{model}",
+        },
+        "interfaces": [
+            {"name": f"eno{n}", "mac_address": f"aa:bb:cc:dd:{model:02x}:{n:02x}"}
+            for n in range(4)
+        ],
+    }
+
+
+def python_yaml(value):
+    return yaml.dump(value)
+
+
+def yaml_column(value):
+    return YamlColumn(value).human_readable()
+
+
+def json_column(value):
+    return JsonColumn(value).human_readable()
+
+
+def main(rows=2000, distinct=20):
+    # One cell per shared blob, which repeat across the inventory.
+    values = [
+        make_properties(i, distinct)["baremetal_capabilities"] for i in range(rows)
+    ] + [make_properties(i, distinct)["interfaces"] for i in range(rows)]
+    assert [yaml_column(v) for v in values] == [python_yaml(v) for v in values]
+    for fn in (python_yaml, yaml_column, json_column):
+        seconds = min(
+            timeit.repeat(
+                lambda: [fn(v) for v in values],
+                setup=_render_yaml.cache_clear,
+                number=1,
+            )
+        )
+        print(
+            f"{fn.__name__:>12}: {seconds * 1e6 / len(values):8.1f} us per cell "
+            f"({len(values)} cells, {distinct} distinct)"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))